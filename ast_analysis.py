@@ -0,0 +1,423 @@
+"""
+AST Analysis - Analyzers that run over an already-built ASTBackend tree
+"""
+
+import clang.cindex
+from typing import Dict, List, Any, Optional
+from ast_backend import ASTBackend, ASTNode, _is_declaration_kind
+
+# Operators a BINARY_OPERATOR token can spell (longest first for the fallback scan)
+BINARY_OPERATORS = ['<<=', '>>=', '==', '!=', '<=', '>=', '<<', '>>', '&&', '||',
+                    '+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=',
+                    '<', '>', '+', '-', '*', '/', '%', '&', '|', '^', '=', ',']
+
+CONTROL_FLOW_KINDS = {
+    clang.cindex.CursorKind.IF_STMT,
+    clang.cindex.CursorKind.FOR_STMT,
+    clang.cindex.CursorKind.WHILE_STMT,
+}
+
+ASSIGNMENT_OPERATORS = {'=', '+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=', '<<=', '>>='}
+
+INCREMENT_OPERATORS = {'++', '--'}
+
+FUNCTION_KINDS = {
+    clang.cindex.CursorKind.FUNCTION_DECL,
+    clang.cindex.CursorKind.CXX_METHOD,
+    clang.cindex.CursorKind.CONSTRUCTOR,
+    clang.cindex.CursorKind.DESTRUCTOR,
+    clang.cindex.CursorKind.FUNCTION_TEMPLATE,
+}
+
+VARIABLE_KINDS = {
+    clang.cindex.CursorKind.VAR_DECL,
+    clang.cindex.CursorKind.PARM_DECL,
+}
+
+# Highlight tags produced by semantic_highlight_ranges (the source viewer configures each)
+SEMANTIC_TAGS = ('keyword', 'comment', 'string', 'number', 'type', 'function',
+                 'member', 'parameter', 'namespace', 'macro', 'preprocessor')
+
+def _semantic_kind_tags() -> Dict[Any, str]:
+    """Declaration kind -> highlight tag for identifiers naming (or referring to) it"""
+    CursorKind = clang.cindex.CursorKind
+    tags = {kind: 'function' for kind in FUNCTION_KINDS}
+    tags[CursorKind.CONVERSION_FUNCTION] = 'function'
+    for kind in (CursorKind.STRUCT_DECL, CursorKind.CLASS_DECL, CursorKind.UNION_DECL,
+                 CursorKind.ENUM_DECL, CursorKind.TYPEDEF_DECL, CursorKind.TYPE_ALIAS_DECL,
+                 CursorKind.CLASS_TEMPLATE, CursorKind.CLASS_TEMPLATE_PARTIAL_SPECIALIZATION,
+                 CursorKind.TEMPLATE_TYPE_PARAMETER, CursorKind.TYPE_ALIAS_TEMPLATE_DECL):
+        tags[kind] = 'type'
+    tags[CursorKind.FIELD_DECL] = 'member'
+    tags[CursorKind.ENUM_CONSTANT_DECL] = 'member'
+    tags[CursorKind.PARM_DECL] = 'parameter'
+    tags[CursorKind.NAMESPACE] = 'namespace'
+    tags[CursorKind.NAMESPACE_ALIAS] = 'namespace'
+    tags[CursorKind.MACRO_DEFINITION] = 'macro'
+    return tags
+
+def _reference_fallback_tags() -> Dict[Any, str]:
+    """Reference kind -> tag, used when the referenced declaration is not in the index"""
+    CursorKind = clang.cindex.CursorKind
+    return {
+        CursorKind.TYPE_REF: 'type',
+        CursorKind.TEMPLATE_REF: 'type',
+        CursorKind.NAMESPACE_REF: 'namespace',
+        CursorKind.MEMBER_REF: 'member',
+        CursorKind.MEMBER_REF_EXPR: 'member',
+        CursorKind.CALL_EXPR: 'function',
+    }
+
+# Identifiers the lexer reports as plain identifiers but that read as keywords
+CONTEXTUAL_KEYWORDS = {'override', 'final', 'import', 'module'}
+
+def _identifier_tags(backend: ASTBackend) -> Dict[tuple, str]:
+    """(line, column) of main-file declaration names and references -> highlight tag"""
+    kind_tags = _semantic_kind_tags()
+    fallback_tags = _reference_fallback_tags()
+    nodes = backend.nodes
+    ref_targets = backend.ref_targets
+    tags = {}
+    
+    # Pre-order: deeper nodes at the same location (e.g. a call's callee) win
+    for node_id in backend.main_file_ids:
+        cursor = nodes[node_id].cursor
+        if not isinstance(cursor, clang.cindex.Cursor):
+            continue
+        try:
+            kind = cursor.kind
+            tag = kind_tags.get(kind)
+            if tag is None:
+                target = ref_targets[node_id]
+                if target is not None:
+                    tag = kind_tags.get(target.cursor.kind)
+                    if tag is None and target.cursor.kind == clang.cindex.CursorKind.VAR_DECL:
+                        continue  # Plain variables keep the default color
+                if tag is None:
+                    tag = fallback_tags.get(kind)
+            if tag is not None:
+                location = cursor.location
+                tags[(location.line, location.column)] = tag
+        except Exception:
+            continue
+    return tags
+
+def _add_span(ranges, tag: str, line: int, column: int, text: str):
+    """Append a token's (per-line) spans to a tag's range lists"""
+    lines, spans = ranges[tag]
+    start = column - 1
+    for piece in text.split('\n'):
+        lines.append(line)
+        spans.append((line, start, start + len(piece)))
+        line += 1
+        start = 0
+
+def _run_semantic_highlighting(backend: ASTBackend) -> Dict[str, tuple]:
+    """Single pass over the main-file tokens, classified by TokenKind and referenced cursor kind"""
+    identifier_tags = _identifier_tags(backend)
+    ranges = {tag: ([], []) for tag in SEMANTIC_TAGS}
+    macro_names = set()
+    directive = None      # Preprocessor directive of the current line
+    directive_line = 0
+    previous_line = 0
+    previous = None
+    previous_first_on_line = False
+    
+    for token in backend.get_tokens():
+        first_on_line = token.line != previous_line
+        kind = token.kind
+        spelling = token.spelling
+        
+        if token.line != directive_line:
+            directive = None
+        if previous is not None and previous.spelling == '#' and previous_first_on_line \
+                and kind in ('IDENTIFIER', 'KEYWORD') and token.line == previous.line:
+            # '#' + directive name, e.g. #include / #define / #if
+            directive = spelling
+            directive_line = token.line
+            _add_span(ranges, 'preprocessor', previous.line, previous.column, '#')
+            _add_span(ranges, 'preprocessor', token.line, token.column, spelling)
+        elif kind == 'COMMENT':
+            _add_span(ranges, 'comment', token.line, token.column, spelling)
+        elif directive == 'include' and spelling != '#':
+            _add_span(ranges, 'string', token.line, token.column, spelling)
+        elif kind == 'KEYWORD':
+            _add_span(ranges, 'keyword', token.line, token.column, spelling)
+        elif kind == 'LITERAL':
+            tag = 'number' if spelling[:1].isdigit() or spelling[:1] == '.' else 'string'
+            _add_span(ranges, tag, token.line, token.column, spelling)
+        elif kind == 'IDENTIFIER':
+            tag = identifier_tags.get((token.line, token.column))
+            if directive == 'define' and previous is not None and previous.spelling == 'define':
+                macro_names.add(spelling)
+                tag = 'macro'
+            elif tag is None and spelling in macro_names:
+                tag = 'macro'
+            elif tag is None and spelling in CONTEXTUAL_KEYWORDS:
+                tag = 'keyword'
+            if tag is not None:
+                _add_span(ranges, tag, token.line, token.column, spelling)
+        
+        previous_first_on_line = first_on_line
+        previous_line = token.line
+        previous = token
+    
+    return ranges
+
+def semantic_highlight_ranges(backend: ASTBackend) -> Dict[str, tuple]:
+    """Per-tag source ranges for the parsed main file (cached per parse)
+    
+    Same layout as the source viewer's regex tokenizer: {tag: (lines, spans)}
+    with spans (line, start_col, end_col), 1-based lines, 0-based columns.
+    """
+    return backend.get_cached('semantic_highlights', lambda: _run_semantic_highlighting(backend))
+
+# Declarations too fine-grained to mark in the source gutter
+_UNMARKED_DECLARATION_KINDS = {
+    clang.cindex.CursorKind.PARM_DECL,
+    clang.cindex.CursorKind.TEMPLATE_TYPE_PARAMETER,
+    clang.cindex.CursorKind.TEMPLATE_NON_TYPE_PARAMETER,
+    clang.cindex.CursorKind.TEMPLATE_TEMPLATE_PARAMETER,
+}
+
+def _run_line_markers(backend: ASTBackend) -> Dict[int, str]:
+    line_map = backend.get_line_map()
+    nodes = backend.nodes
+    markers = {}
+    for node_id, (start_line, _, _, _) in line_map.extents.items():
+        if markers.get(start_line) == 'definition':
+            continue
+        cursor = nodes[node_id].cursor
+        try:
+            kind = cursor.kind
+            if not _is_declaration_kind(kind) or kind in _UNMARKED_DECLARATION_KINDS:
+                continue
+            markers[start_line] = 'definition' if cursor.is_definition() else 'declaration'
+        except Exception:
+            continue
+    return markers
+
+def line_markers(backend: ASTBackend) -> Dict[int, str]:
+    """Main-file line -> 'definition' or 'declaration' for lines where one starts (cached per parse)"""
+    return backend.get_cached('line_markers', lambda: _run_line_markers(backend))
+
+def binary_operator_spelling(backend: ASTBackend, node: ASTNode) -> str:
+    """Get the operator of a main-file BINARY_OPERATOR node from the cached token stream"""
+    tokens = backend.get_tokens_in_extent(node.cursor.extent)
+    if not tokens:
+        return ""
+    
+    # The operator is the first token after the left-hand operand
+    if node.children:
+        try:
+            lhs_end = node.children[0].cursor.extent.end.offset
+            for token in tokens:
+                if token.offset >= lhs_end:
+                    if token.spelling in BINARY_OPERATORS:
+                        return token.spelling
+                    break
+        except Exception:
+            pass
+    
+    # Fall back to the first operator-looking token (e.g. for macro expansions)
+    for token in tokens:
+        if token.spelling in BINARY_OPERATORS:
+            return token.spelling
+    return ""
+
+def unary_operator_spelling(backend: ASTBackend, node: ASTNode) -> str:
+    """Get the operator of a main-file UNARY_OPERATOR node (prefix or postfix) from the token stream"""
+    tokens = backend.get_tokens_in_extent(node.cursor.extent)
+    if not tokens or not node.children:
+        return ""
+    try:
+        operand = node.children[0].cursor.extent
+        if tokens[0].offset < operand.start.offset:
+            return tokens[0].spelling
+        if tokens[-1].offset >= operand.end.offset:
+            return tokens[-1].spelling
+    except Exception:
+        pass
+    return ""
+
+class DependencyReport:
+    """Structured result of the dependency analysis for one parse"""
+    
+    def __init__(self, filename: Optional[str]):
+        self.filename = filename
+        self.data_deps: List[str] = []       # Declared variable names
+        self.compute_deps: List[str] = []    # Called function names
+        self.control_deps: List[str] = []    # Control flow statement kinds
+        self.what_when: List[Dict[str, Any]] = []  # Timeline of declarations and operators
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the report as plain data (e.g. for JSON output in batch jobs)"""
+        return {
+            'file': self.filename,
+            'data_deps': self.data_deps,
+            'compute_deps': self.compute_deps,
+            'control_deps': self.control_deps,
+            'what_when': self.what_when,
+        }
+    
+    def __repr__(self):
+        return (f"<DependencyReport {self.filename}: {len(self.data_deps)} data, "
+                f"{len(self.compute_deps)} compute, {len(self.control_deps)} control, "
+                f"{len(self.what_when)} events>")
+
+def _location_key(cursor) -> str:
+    location = cursor.location
+    return f"{location.line}:{location.column}"
+
+def _run_dependency_analysis(backend: ASTBackend) -> DependencyReport:
+    """Single pass over the main-file nodes (pre-order, so the timeline stays in source order)"""
+    report = DependencyReport(backend.current_file)
+    CursorKind = clang.cindex.CursorKind
+    
+    for node_id in backend.main_file_ids:
+        node = backend.nodes[node_id]
+        cursor = node.cursor
+        if not isinstance(cursor, clang.cindex.Cursor):
+            continue
+        try:
+            kind = cursor.kind
+            if kind == CursorKind.BINARY_OPERATOR:
+                report.what_when.append({'action': 'bin_op',
+                                         'operation': binary_operator_spelling(backend, node),
+                                         'when': _location_key(cursor)})
+            elif kind == CursorKind.VAR_DECL:
+                report.data_deps.append(cursor.spelling)
+                report.what_when.append({'action': 'declared', 'var': cursor.spelling,
+                                         'when': _location_key(cursor)})
+            elif kind == CursorKind.CALL_EXPR:
+                report.compute_deps.append(cursor.spelling)
+            elif kind in CONTROL_FLOW_KINDS:
+                report.control_deps.append(kind.name)
+        except Exception:
+            continue
+    
+    return report
+
+def analyze_dependencies(backend: ASTBackend) -> DependencyReport:
+    """Data, compute and control dependencies of the parsed main file (cached per parse)"""
+    return backend.get_cached('dependencies', lambda: _run_dependency_analysis(backend))
+
+class FunctionDefUse:
+    """Compact def-use table for one function: variable declaration node -> site node_id lists"""
+    
+    def __init__(self, function_id: int):
+        self.function_id = function_id
+        self.definitions: Dict[ASTNode, List[int]] = {}  # Declarations (VAR_DECL/PARM_DECL)
+        self.assignments: Dict[ASTNode, List[int]] = {}  # Assignment/++/-- operators writing the variable
+        self.reads: Dict[ASTNode, List[int]] = {}        # DECL_REF_EXPRs reading the variable (also += and ++)
+        self.order: List[ASTNode] = []                   # Variables in first-seen order
+    
+    def _add(self, table: Dict[ASTNode, List[int]], var: ASTNode, site_id: int):
+        if var not in self.definitions and var not in self.assignments and var not in self.reads:
+            self.order.append(var)
+        table.setdefault(var, []).append(site_id)
+    
+    def rows(self, backend: ASTBackend) -> List[Dict[str, Any]]:
+        """Materialize the table into per-variable rows of ASTNodes (done on selection)"""
+        nodes = backend.nodes
+        return [{
+            'variable': var,
+            'definitions': [nodes[i] for i in self.definitions.get(var, [])],
+            'assignments': [nodes[i] for i in self.assignments.get(var, [])],
+            'reads': [nodes[i] for i in self.reads.get(var, [])],
+        } for var in self.order]
+
+def _strip_implicit(node: ASTNode) -> ASTNode:
+    """Look through implicit casts/parentheses to the expression underneath"""
+    CursorKind = clang.cindex.CursorKind
+    while node.children and node.cursor.kind in (CursorKind.UNEXPOSED_EXPR, CursorKind.PAREN_EXPR):
+        node = node.children[0]
+    return node
+
+def _run_def_use_analysis(backend: ASTBackend) -> Dict[int, FunctionDefUse]:
+    """Single pass over the main-file nodes, attributing each site to its innermost function"""
+    CursorKind = clang.cindex.CursorKind
+    nodes = backend.nodes
+    ref_targets = backend.ref_targets
+    tables: Dict[int, FunctionDefUse] = {}
+    open_functions: List[FunctionDefUse] = []  # Stack of enclosing functions
+    open_ends: List[int] = []                  # Their pre-order subtree ends
+    written = set()  # DECL_REF_EXPRs on the left of a plain '=' (the only write that doesn't read)
+    
+    for node_id in backend.main_file_ids:
+        while open_ends and node_id >= open_ends[-1]:
+            open_functions.pop()
+            open_ends.pop()
+        
+        node = nodes[node_id]
+        cursor = node.cursor
+        if not isinstance(cursor, clang.cindex.Cursor):
+            continue
+        try:
+            kind = cursor.kind
+            if kind in FUNCTION_KINDS:
+                table = tables[node_id] = FunctionDefUse(node_id)
+                open_functions.append(table)
+                open_ends.append(node.subtree_end)
+                continue
+            if not open_functions:
+                continue
+            table = open_functions[-1]
+            
+            if kind in VARIABLE_KINDS:
+                table._add(table.definitions, node, node_id)
+            elif kind in (CursorKind.COMPOUND_ASSIGNMENT_OPERATOR, CursorKind.BINARY_OPERATOR,
+                          CursorKind.UNARY_OPERATOR):
+                if kind == CursorKind.COMPOUND_ASSIGNMENT_OPERATOR:
+                    operator = '+='  # Any compound operator: writes and reads its target
+                elif kind == CursorKind.BINARY_OPERATOR:
+                    operator = binary_operator_spelling(backend, node)
+                    if operator not in ASSIGNMENT_OPERATORS:
+                        continue
+                else:
+                    operator = unary_operator_spelling(backend, node)
+                    if operator not in INCREMENT_OPERATORS:
+                        continue
+                target = _strip_implicit(node.children[0]) if node.children else None
+                if target is not None and target.cursor.kind == CursorKind.DECL_REF_EXPR:
+                    var = ref_targets[target.node_id]
+                    if var is not None and var.cursor.kind in VARIABLE_KINDS:
+                        table._add(table.assignments, var, node_id)
+                        if operator == '=':
+                            written.add(target.node_id)
+            elif kind == CursorKind.DECL_REF_EXPR and node_id not in written:
+                var = ref_targets[node_id]
+                if var is not None and var.cursor.kind in VARIABLE_KINDS:
+                    table._add(table.reads, var, node_id)
+        except Exception:
+            continue
+    
+    return tables
+
+def compute_def_use(backend: ASTBackend) -> Dict[int, FunctionDefUse]:
+    """Def-use tables for every main-file function, keyed by function node_id (cached per parse)"""
+    return backend.get_cached('def_use', lambda: _run_def_use_analysis(backend))
+
+def function_def_use(backend: ASTBackend, function_node: ASTNode) -> Optional[FunctionDefUse]:
+    """Def-use table for one function node, or None if it is not a main-file function"""
+    # Shared header nodes carry node_ids from the backend that built them
+    if not backend.owns_node(function_node) or function_node.cursor.kind not in FUNCTION_KINDS:
+        return None
+    return compute_def_use(backend).get(function_node.node_id)
+
+if __name__ == "__main__":
+    import json
+    import sys
+    
+    if len(sys.argv) < 2:
+        print("Usage: python ast_analysis.py <file.cpp> [<file.cpp> ...]")
+        sys.exit(1)
+    
+    # One backend (and libclang index) is reused for the whole batch
+    batch_backend = ASTBackend()
+    for filename in sys.argv[1:]:
+        try:
+            batch_backend.parse_file(filename)
+            print(json.dumps(analyze_dependencies(batch_backend).to_dict()))
+        except Exception as e:
+            print(json.dumps({'file': filename, 'error': str(e)}))
@@ -2,10 +2,42 @@
 AST Backend - Core logic for parsing and managing clang AST data
 """
 
-import clang_config  # This will auto-configure libclang
+import os
+import mmap
+import hashlib
+import threading
+import time
+import weakref
+import clang_config  # libclang is configured lazily by ASTBackend()
 import clang.cindex
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import islice
 from typing import Dict, List, Any, Optional
 
+# Plain-Python snapshot of a libclang token, so repeated lookups stay out of ctypes
+TokenInfo = namedtuple('TokenInfo', ['offset', 'line', 'column', 'kind', 'spelling'])
+
+_DECLARATION_KINDS = {}
+
+def file_digest(path: str) -> Optional[str]:
+    """blake2b digest of a file's content, hashed straight from an mmap (None if unreadable)"""
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return hashlib.blake2b(b'', digest_size=16).hexdigest()  # Empty files can't be mapped
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hashlib.blake2b(mapped, digest_size=16).hexdigest()
+    except (OSError, ValueError):
+        return None
+
+def _is_declaration_kind(kind) -> bool:
+    """Cached CursorKind.is_declaration() - avoids a libclang call per node"""
+    result = _DECLARATION_KINDS.get(kind)
+    if result is None:
+        result = _DECLARATION_KINDS[kind] = kind.is_declaration()
+    return result
+
 class ASTNode:
     """Wrapper class for clang cursor with additional metadata"""
     def __init__(self, cursor: clang.cindex.Cursor, parent=None, index=0):
@@ -14,6 +46,8 @@ class ASTNode:
         self.index = index
         self.children = []
         self.expanded = True
+        self.node_id = -1  # Index into ASTBackend.nodes, assigned during the build
+        self.subtree_end = -1  # One past the last descendant's node_id (pre-order range)
         
     @property
     def display_name(self):
@@ -45,37 +79,37 @@ class ASTNode:
         
         try:
             info['Kind'] = cursor.kind.name if hasattr(cursor.kind, 'name') else str(cursor.kind)
-        except:
+        except Exception:
             info['Kind'] = "<unknown>"
             
         try:
             info['Spelling'] = cursor.spelling or "<none>"
-        except:
+        except Exception:
             info['Spelling'] = "<error>"
             
         try:
             info['Display Name'] = cursor.displayname or "<none>"
-        except:
+        except Exception:
             info['Display Name'] = "<error>"
             
         try:
             info['Location'] = self.location_str
-        except:
+        except Exception:
             info['Location'] = "<unknown>"
             
         try:
             info['Type'] = str(cursor.type.spelling) if cursor.type else "<none>"
-        except:
+        except Exception:
             info['Type'] = "<error>"
             
         try:
             info['Is Definition'] = cursor.is_definition()
-        except:
+        except Exception:
             info['Is Definition'] = "<error>"
             
         try:
             info['Is Declaration'] = cursor.is_declaration()
-        except:
+        except Exception:
             info['Is Declaration'] = "<error>"
         
         # Add cursor-specific information with error handling
@@ -83,17 +117,17 @@ class ASTNode:
             if hasattr(cursor.kind, 'name') and cursor.kind == clang.cindex.CursorKind.VAR_DECL:
                 try:
                     info['Storage Class'] = cursor.storage_class.name if cursor.storage_class else "<none>"
-                except:
+                except Exception:
                     info['Storage Class'] = "<error>"
                     
             elif hasattr(cursor.kind, 'name') and cursor.kind == clang.cindex.CursorKind.FUNCTION_DECL:
                 try:
                     info['Result Type'] = cursor.result_type.spelling if cursor.result_type else "<none>"
-                except:
+                except Exception:
                     info['Result Type'] = "<error>"
                 try:
                     info['Arguments'] = len(list(cursor.get_arguments()))
-                except:
+                except Exception:
                     info['Arguments'] = "<error>"
                     
             elif hasattr(cursor.kind, 'name') and cursor.kind == clang.cindex.CursorKind.INTEGER_LITERAL:
@@ -101,15 +135,15 @@ class ASTNode:
                     tokens = list(cursor.get_tokens())
                     if tokens:
                         info['Value'] = tokens[0].spelling
-                except:
+                except Exception:
                     info['Value'] = "<error>"
                     
             elif hasattr(cursor.kind, 'name') and cursor.kind == clang.cindex.CursorKind.BINARY_OPERATOR:
                 try:
                     info['Operator'] = self._extract_binary_operator()
-                except:
+                except Exception:
                     info['Operator'] = "<error>"
-        except:
+        except Exception:
             pass
             
         # Add token information for all cursors with error handling
@@ -119,7 +153,7 @@ class ASTNode:
                 info['Tokens'] = [t.spelling for t in tokens[:10]]  # Limit to first 10 tokens
                 if len(tokens) > 10:
                     info['Tokens'].append('...')
-        except:
+        except Exception:
             info['Tokens'] = "<error>"
         
         return info
@@ -149,26 +183,466 @@ class ASTNode:
         
         return ""
 
+def _top_level_signature(cursor: clang.cindex.Cursor) -> tuple:
+    """What identifies a top-level declaration of a header: kind, spelling and extent offsets"""
+    extent = cursor.extent
+    return (cursor.kind, cursor.spelling, extent.start.offset, extent.end.offset)
+
+class HeaderSubtree:
+    """Top-level AST nodes contributed by one header, shareable between translation units"""
+    
+    def __init__(self, key: tuple):
+        self.key = key  # (header path as libclang spells it, content hash, macro state)
+        self.nodes: List[ASTNode] = []
+        self.signatures: List[tuple] = []  # _top_level_signature of each node, checked on reuse
+        self._usr_index = None
+        self._derived: Dict[str, Any] = {}  # Data derived from the (immutable) subtree
+    
+    @property
+    def path(self) -> str:
+        return self.key[0]
+    
+    def get_cached(self, key: str, factory):
+        """Return derived data for this subtree, computing it once for every TU that shares it"""
+        if key not in self._derived:
+            self._derived.setdefault(key, factory())
+        return self._derived[key]
+    
+    def usr_index(self) -> Dict[str, ASTNode]:
+        """USR -> declaration node, built on first use (cursors can't be compared across TUs)"""
+        if self._usr_index is None:
+            index = {}
+            stack = list(reversed(self.nodes))
+            while stack:
+                node = stack.pop()
+                try:
+                    kind = node.cursor.kind
+                    if _is_declaration_kind(kind) and kind != clang.cindex.CursorKind.PARM_DECL:
+                        usr = node.cursor.get_usr()
+                        if usr and (usr not in index or node.cursor.is_definition()):
+                            index[usr] = node
+                except Exception:
+                    pass
+                stack.extend(reversed(node.children))
+            self._usr_index = index
+        return self._usr_index
+
+class HeaderSubtreeStore:
+    """Hash-consed store of header subtrees shared by every ASTBackend in the process
+    
+    Entries are keyed by (header path, content hash, macro state) and held weakly:
+    a subtree lives as long as some backend's current tree still uses it.
+    """
+    
+    # Arguments that can change what a header expands to
+    MACRO_ARG_PREFIXES = ('-D', '-U', '-I', '-isystem', '-include', '-std', '--target', '-x', '-f')
+    
+    def __init__(self):
+        self._entries = weakref.WeakValueDictionary()
+        self._hash_cache: Dict[str, tuple] = {}  # path -> (mtime_ns, size, digest)
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def macro_state(cls, args: list, directives: List[str] = ()) -> str:
+        """Digest of the preprocessor-relevant parse arguments and main-file directives"""
+        relevant = [arg for arg in (args or []) if arg.startswith(cls.MACRO_ARG_PREFIXES)]
+        relevant.extend(directives)
+        return hashlib.blake2b('\0'.join(relevant).encode('utf-8'), digest_size=8).hexdigest()
+    
+    def content_hash(self, path: str) -> Optional[str]:
+        """Content digest of a header, re-hashed only when its mtime or size changes"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._hash_cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = file_digest(path)
+        if digest is None:
+            return None
+        with self._lock:
+            self._hash_cache[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+    
+    def get(self, key: tuple) -> Optional[HeaderSubtree]:
+        with self._lock:
+            return self._entries.get(key)
+    
+    def put(self, subtree: HeaderSubtree):
+        with self._lock:
+            self._entries.setdefault(subtree.key, subtree)
+    
+    def invalidate(self, path: str):
+        """Forget every stored subtree (and the cached hash) of a header"""
+        real_path = os.path.realpath(path)
+        with self._lock:
+            for cached_path in [p for p in self._hash_cache if os.path.realpath(p) == real_path]:
+                del self._hash_cache[cached_path]
+            for key in [key for key in self._entries.keys() if os.path.realpath(key[0]) == real_path]:
+                self._entries.pop(key, None)
+    
+    def __len__(self):
+        return len(self._entries)
+
+# Shared by default so that several open translation units reuse one copy of each header
+shared_header_store = HeaderSubtreeStore()
+
+class ParseCache:
+    """Small LRU of finished parses, keyed by the main file's content digest and the arguments
+    
+    Reverting a file (undo, git checkout) or reloading one whose content did
+    not change gets the earlier parse back without running libclang. An entry
+    is only used while every file it included still has the digest it had
+    when it was parsed.
+    
+    Memory: each entry keeps its translation unit and its own main-file
+    nodes alive (header nodes are shared with the header store anyway). The
+    translation unit dominates: about 14 MB for a file including a few
+    standard headers (test/comprehensive_test.cpp), so the default of 4
+    entries costs up to roughly 60 MB on top of the displayed parse. Set
+    "parse_cache_size" in the config file to change it (0 turns it off).
+    """
+    
+    SIZE = 4  # Entries kept; each one pins a translation unit (see above)
+    
+    def __init__(self, size: int = SIZE):
+        self.size = max(0, size)
+        self._entries: Dict[tuple, dict] = {}  # Oldest first
+        self._lock = threading.Lock()
+    
+    def get(self, key: tuple, header_store: HeaderSubtreeStore) -> Optional[dict]:
+        with self._lock:
+            state = self._entries.pop(key, None)
+            if state is None:
+                return None
+            self._entries[key] = state  # Most recently used
+        for path, digest in state['file_digests'].items():
+            if path != key[0] and header_store.content_hash(path) != digest:
+                with self._lock:
+                    self._entries.pop(key, None)
+                return None
+        return state
+    
+    def put(self, key: tuple, state: dict):
+        if not self.size:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = state
+            while len(self._entries) > self.size:
+                del self._entries[next(iter(self._entries))]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+shared_parse_cache = ParseCache(clang_config.load_user_config().get('parse_cache_size', ParseCache.SIZE))
+
+class LineNodeMap:
+    """Main-file source line -> ids of the nodes starting on or spanning it
+    
+    Ids per line are in pre-order (outer nodes first), so the innermost node
+    at a position is the last one on the line whose extent contains it.
+    """
+    
+    def __init__(self, backend: 'ASTBackend'):
+        self.nodes = backend.nodes
+        self.extents: Dict[int, tuple] = {}  # node_id -> (start_line, start_col, end_line, end_col)
+        self.lines: List[List[int]] = [[]]   # Indexed by 1-based line
+        
+        for node_id in backend.main_file_ids:
+            cursor = self.nodes[node_id].cursor
+            if not isinstance(cursor, clang.cindex.Cursor):
+                continue
+            try:
+                extent = cursor.extent
+                start, end = extent.start, extent.end
+                span = (start.line, start.column, end.line, end.column)
+            except Exception:
+                continue
+            if span[0] < 1 or span[2] < span[0]:
+                continue  # Implicit nodes without a real source range
+            self.extents[node_id] = span
+            while len(self.lines) <= span[2]:
+                self.lines.append([])
+            for line in range(span[0], span[2] + 1):
+                self.lines[line].append(node_id)
+    
+    def ids_on_line(self, line: int) -> List[int]:
+        return self.lines[line] if 0 < line < len(self.lines) else []
+    
+    def nodes_on_line(self, line: int) -> List[ASTNode]:
+        """Nodes starting on or spanning a line, outermost first"""
+        return [self.nodes[i] for i in self.ids_on_line(line)]
+    
+    def nodes_starting_on(self, line: int) -> List[ASTNode]:
+        """Nodes whose extent starts on a line, outermost first"""
+        return [self.nodes[i] for i in self.ids_on_line(line) if self.extents[i][0] == line]
+    
+    def innermost(self, line: int, column: int) -> Optional[ASTNode]:
+        """Most specific node whose extent contains a (1-based) line and column"""
+        for node_id in reversed(self.ids_on_line(line)):
+            start_line, start_col, end_line, end_col = self.extents[node_id]
+            if line == start_line and column < start_col:
+                continue
+            if line == end_line and column >= end_col:
+                continue
+            return self.nodes[node_id]
+        return None
+
+def _iter_subtree(root: Optional[ASTNode]):
+    """Nodes of a tree in pre-order, without recursion"""
+    if root is None:
+        return
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+def _cursor_kind(kind) -> clang.cindex.CursorKind:
+    """A CursorKind from itself or its name ('CALL_EXPR')"""
+    if isinstance(kind, str):
+        try:
+            return getattr(clang.cindex.CursorKind, kind)
+        except AttributeError:
+            raise ValueError(f"Unknown cursor kind: {kind}") from None
+    return kind
+
+def _node_kind(node: ASTNode) -> Optional[clang.cindex.CursorKind]:
+    """Cursor kind of a node, or None when the bindings don't know the kind"""
+    try:
+        return node.cursor.kind
+    except ValueError:  # Kind id newer than the bindings
+        return None
+
+def _node_file(node: ASTNode) -> Optional[str]:
+    """Name of the file a node is located in (None for error nodes and builtins)"""
+    location = node.cursor.location
+    if location is None or location.file is None:
+        return None
+    return location.file.name
+
+class NodeQuery:
+    """Lazy, chainable set of tree nodes matching some filters
+    
+    Nothing is collected up front: iteration walks the tree and applies the
+    filters as it goes, count() and len() only count, and indexing or slicing
+    stops as soon as the requested nodes were found. Filters return a new
+    query, so q.of_kind('CALL_EXPR').named('push_back').count() never builds
+    a list. Printed, a query shows its size and first page of nodes.
+    """
+    
+    PAGE_SIZE = 20
+    
+    def __init__(self, root: Optional[ASTNode], filters: tuple = ()):
+        self.root = root  # Bound at creation: a later reparse doesn't change the results
+        self.filters = filters
+        self._count = None
+    
+    def __iter__(self):
+        filters = self.filters
+        for node in _iter_subtree(self.root):
+            if all(predicate(node) for predicate in filters):
+                yield node
+    
+    # Chained filters
+    def filter(self, predicate) -> 'NodeQuery':
+        """Nodes of this query for which predicate(node) is true"""
+        return NodeQuery(self.root, self.filters + (predicate,))
+    
+    def of_kind(self, *kinds) -> 'NodeQuery':
+        """Nodes of any of the given cursor kinds (CursorKind or name)"""
+        wanted = {_cursor_kind(kind) for kind in kinds}
+        return self.filter(lambda node: _node_kind(node) in wanted)
+    
+    def named(self, text: str) -> 'NodeQuery':
+        """Nodes whose spelling contains text (case-sensitive)"""
+        return self.filter(lambda node: text in (node.cursor.spelling or ""))
+    
+    def in_file(self, path: str) -> 'NodeQuery':
+        """Nodes located in a file (compared by path suffix, so a base name works)"""
+        return self.filter(lambda node: (_node_file(node) or "").endswith(path))
+    
+    # Results
+    def count(self) -> int:
+        """Number of matching nodes (counted once, then remembered)"""
+        if self._count is None:
+            self._count = sum(1 for _ in self)
+        return self._count
+    
+    def __len__(self):
+        return self.count()
+    
+    def __bool__(self):
+        return self.first() is not None
+    
+    def first(self) -> Optional[ASTNode]:
+        """First matching node in tree order, or None"""
+        return next(iter(self), None)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.start, index.stop, index.step
+            if any(value is not None and value < 0 for value in (start, stop, step)):
+                start, stop, step = index.indices(self.count())
+                if step < 0:
+                    return list(self)[index]
+            return list(islice(self, start, stop, step))
+        if index < 0:
+            index += self.count()
+        if index >= 0:
+            for node in islice(self, index, None):
+                return node
+        raise IndexError("NodeQuery index out of range")
+    
+    def to_list(self) -> List[ASTNode]:
+        """All matching nodes as a list"""
+        return list(self)
+    
+    def page(self, number: int = 1, size: int = PAGE_SIZE) -> str:
+        """Text listing of one (1-based) page of the results"""
+        start = max(0, number - 1) * size
+        total = self.count()
+        lines = [f"{total:,} node(s); page {number} of {max(1, -(-total // size))}:"]
+        for position, node in enumerate(islice(self, start, start + size), start):
+            try:
+                lines.append(f"  [{position}] {node.display_name}  ({node.location_str})")
+            except Exception:
+                lines.append(f"  [{position}] {node.cursor.spelling}")
+        if start + size < total:
+            lines.append(f"  ... .page({number + 1}) for more, [i] / [a:b] to get nodes")
+        return "\n".join(lines)
+    
+    def __str__(self):
+        return self.page(1)
+    
+    def __repr__(self):
+        return f"<NodeQuery: {self.count():,} node(s)>"
+
 class ASTBackend:
     """Backend for managing clang AST parsing and data"""
     
-    def __init__(self):
+    def __init__(self, header_store: Optional[HeaderSubtreeStore] = None,
+                 parse_cache: Optional[ParseCache] = None):
+        clang_config.ensure_libclang()
         self.index = clang.cindex.Index.create()
         self.translation_unit = None
         self.root_node = None
         self.current_file = None
+        self.current_args: list = []
+        
+        # Header subtrees come from (and go to) a store shared with other backends
+        self.header_store = header_store if header_store is not None else shared_header_store
+        self.parse_cache = parse_cache if parse_cache is not None else shared_parse_cache
+        self.file_digests: Dict[str, str] = {}  # abspath -> content digest of every file the parse read
+        self.parse_timings: Dict[str, float] = {}  # Seconds spent in libclang ('parse') and building nodes ('build')
+        self._header_subtrees: List[HeaderSubtree] = []  # Keeps used entries alive
+        self._reused_positions: Dict[ASTNode, int] = {}  # Reused top-level node -> index in root
+        self._shared_positions: Dict[ASTNode, int] = {}  # Every store top-level node (built or reused) -> index
+        
+        # Flat node table and reference edges, rebuilt on every parse
+        self.nodes: List[ASTNode] = []          # node_id -> ASTNode built by this backend (pre-order)
+        self.ref_targets: List[Optional[ASTNode]] = []  # node_id -> referenced declaration node
+        self.referenced_by: Dict[ASTNode, List[int]] = {}  # declaration node -> referencing node_ids
+        self._decl_index = {}                   # declaration cursor -> ASTNode
+        self._pending_refs = []                 # (node_id, referenced cursor) found while building
+        self._main_file = None
+        self._main_path_cache: Dict[str, bool] = {}
+        self.main_file_ids: List[int] = []      # node_ids of main-file nodes, in pre-order
         
-    def parse_file(self, filename: str, args: list = None):
-        """Parse a C++ file and build the AST tree"""
+        # Bumped on every parse; derived data (tokens, analyses) is cached per generation
+        self.generation = 0
+        self._derived: Dict[str, Any] = {}
+    
+    # Everything a parse produces; swapped as a unit by commit_parse()
+    _PARSE_STATE = ('translation_unit', 'root_node', 'current_file', 'current_args',
+                    '_header_subtrees', '_reused_positions', '_shared_positions', 'nodes', 'ref_targets',
+                    'referenced_by', '_decl_index', '_main_file', '_main_path_cache',
+                    'main_file_ids', '_derived', 'file_digests')
+    
+    def prepare_parse(self, filename: str, args: list = None, contents: str = None) -> 'ASTBackend':
+        """Parse into a staging backend without touching this one (safe off the UI thread)"""
+        staged = ASTBackend(header_store=self.header_store, parse_cache=self.parse_cache)
+        staged.parse_file(filename, args, contents)
+        return staged
+    
+    def commit_parse(self, staged: 'ASTBackend'):
+        """Atomically adopt the result of prepare_parse()"""
+        for name in self._PARSE_STATE:
+            setattr(self, name, getattr(staged, name))
+        self.generation += 1
+    
+    def parse_file(self, filename: str, args: list = None, contents: str = None):
+        """Parse a C++ file and build the AST tree (or reuse the cached parse of identical content)
+        
+        With contents, the file is parsed from that text (an unsaved editor
+        buffer) instead of from disk.
+        """
         self.current_file = filename
         
         # Use the same simple approach as graphclang.py - no custom args by default
         if args is None:
             args = []
+        self.current_args = list(args)
+        
+        if contents is None:
+            digest = file_digest(filename)
+            unsaved_files = None
+        else:
+            digest = hashlib.blake2b(contents.encode('utf-8'), digest_size=16).hexdigest()
+            unsaved_files = [(filename, contents)]
+        cache_key = (os.path.abspath(filename), digest, tuple(args))
+        if cache_key[1] is not None and self.parse_cache is not None:
+            cached = self.parse_cache.get(cache_key, self.header_store)
+            if cached is not None:
+                for name, value in cached.items():
+                    setattr(self, name, value)
+                self.generation += 1
+                self.parse_timings = {'parse': 0.0, 'build': 0.0}
+                return
+        
+        start = time.perf_counter()
+        self.parse_timings = {'build': 0.0}
+        self._parse_uncached(filename, args, unsaved_files)
+        self.parse_timings['parse'] = time.perf_counter() - start - self.parse_timings['build']
+        self.file_digests = self._read_digests(cache_key[1])
+        if cache_key[1] is not None and self.parse_cache is not None:
+            self.parse_cache.put(cache_key, {name: getattr(self, name) for name in self._PARSE_STATE})
+    
+    def _read_digests(self, main_digest: str) -> Dict[str, str]:
+        """Content digests of the main file and every included file, for change checks"""
+        digests = {os.path.abspath(self.current_file): main_digest}
+        for path in self.get_include_files()[1:]:
+            digest = self.header_store.content_hash(path)
+            if digest is not None:
+                digests[path] = digest
+        return digests
+    
+    def changed_files(self, paths) -> set:
+        """The paths whose content differs from what the current parse read
         
+        Touching a file, saving it unchanged or checking out identical content
+        changes its mtime but not its digest; such files are left out.
+        """
+        changed = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            recorded = self.file_digests.get(path)
+            if recorded is None or file_digest(path) != recorded:
+                changed.add(path)
+        return changed
+    
+    def _parse_uncached(self, filename: str, args: list, unsaved_files: list = None):
+        """Run libclang and build the tree"""
         try:
             # Use the same simple approach as graphclang.py
-            self.translation_unit = self.index.parse(filename, args=args)
+            self.translation_unit = self.index.parse(filename, args=args, unsaved_files=unsaved_files)
             
             if not self.translation_unit:
                 raise Exception(f"Failed to create translation unit for {filename}")
@@ -177,26 +651,28 @@ class ASTBackend:
             # Let it proceed even with warnings/errors
             
             # Build our tree structure with error handling
-            self.root_node = self._build_tree(self.translation_unit.cursor)
-            
+            self.root_node = self._build_root(self.translation_unit.cursor)
+        
         except Exception as e:
             if "Unknown template argument kind" in str(e):
                 # Try with different C++ standards
                 for std in ['c++20', 'c++14', 'c++11']:
                     try:
                         alt_args = [f'-std={std}'] + [arg for arg in args if not arg.startswith('-std=')]
+                        self.current_args = alt_args
                         self.translation_unit = self.index.parse(
                             filename, 
                             args=alt_args,
+                            unsaved_files=unsaved_files,
                             options=clang.cindex.TranslationUnit.PARSE_SKIP_FUNCTION_BODIES
                         )
                         if self.translation_unit:
-                            self.root_node = self._build_tree(self.translation_unit.cursor)
+                            self.root_node = self._build_root(self.translation_unit.cursor)
                             print(f"Successfully parsed with {std} standard")
                             return
-                    except:
+                    except Exception:
                         continue
-                        
+                
                 # If all standards fail, provide helpful error message
                 raise Exception(f"Failed to parse {filename}: {str(e)}\n\n"
                               f"This error often occurs when:\n"
@@ -209,60 +685,229 @@ class ASTBackend:
                               f"- Adding necessary include paths")
             else:
                 raise
+    
+    def _build_root(self, cursor: clang.cindex.Cursor) -> ASTNode:
+        """Build the whole tree for a translation unit cursor, then resolve reference edges"""
+        start = time.perf_counter()
+        self.nodes = []
+        self.ref_targets = []
+        self.referenced_by = {}
+        self._decl_index = {}
+        self._pending_refs = []
+        self._main_file = os.path.abspath(self.current_file) if self.current_file else None
+        self.main_file_ids = []
+        self.generation += 1
+        self._derived = {}
+        self._header_subtrees = []
+        self._reused_positions = {}
+        self._shared_positions = {}
+        self._main_path_cache = {}
+        
+        root = ASTNode(cursor)
+        self._register_node(root, False)
+        macro_state = HeaderSubtreeStore.macro_state(self.current_args, self._directives_before_includes())
+        headers = {}  # header path -> [HeaderSubtree, next reuse position or None while building]
+        try:
+            for i, child in enumerate(cursor.get_children()):
+                try:
+                    child_node = self._build_top_level(child, root, i, headers, macro_state)
+                except Exception as e:
+                    child_node = self._make_error_node(e, child, root, i)
+                    print(f"Warning: Skipped problematic node at child {i}: {str(e)}")
+                root.children.append(child_node)
+        except Exception as e:
+            print(f"Warning: Could not iterate children of {cursor.kind}: {str(e)}")
+        root.subtree_end = len(self.nodes)
         
-    def _build_tree(self, cursor: clang.cindex.Cursor, parent=None, index=0) -> ASTNode:
+        # Publish the headers this parse had to build so other backends can reuse them
+        for subtree, position in headers.values():
+            if position is None:
+                self.header_store.put(subtree)
+        
+        self._resolve_references()
+        self.parse_timings['build'] = time.perf_counter() - start
+        return root
+    
+    def _build_top_level(self, cursor: clang.cindex.Cursor, root: ASTNode, index: int,
+                         headers: dict, macro_state: str) -> ASTNode:
+        """Build (or reuse from the header store) one top-level declaration"""
+        path = self._cursor_file(cursor)
+        if path is not None and self._is_main_path(path):
+            return self._build_tree(cursor, root, index, True)
+        if path is None or self.header_store is None:
+            return self._build_tree(cursor, root, index, False)
+        
+        state = headers.get(path)
+        if state is None:
+            key = (path, self.header_store.content_hash(path), macro_state)
+            subtree = self.header_store.get(key) if key[1] else None
+            if subtree is None:
+                state = headers[path] = [HeaderSubtree(key), None]
+            else:
+                state = headers[path] = [subtree, 0]
+            self._header_subtrees.append(state[0])
+        
+        subtree, position = state
+        if position is None:
+            # No parent link: it would keep this backend's tree (and TU) alive for every sharer
+            node = self._build_tree(cursor, None, index, False)
+            self._shared_positions[node] = index
+            subtree.nodes.append(node)
+            subtree.signatures.append(_top_level_signature(cursor))
+            return node
+        if 0 <= position < len(subtree.nodes) and subtree.signatures[position] == _top_level_signature(cursor):
+            node = subtree.nodes[position]
+            state[1] = position + 1
+            self._reused_positions[node] = index
+            self._shared_positions[node] = index
+            return node
+        # The header expanded differently here (e.g. a macro an earlier header defined):
+        # stop reusing it for this parse and keep private copies of the rest
+        state[1] = -1
+        return self._build_tree(cursor, root, index, False)
+    
+    def _directives_before_includes(self) -> List[str]:
+        """Main-file preprocessor directives other than #include that precede its last #include
+        
+        A #define above an #include changes what the header expands to, so
+        these are part of the header store key.
+        """
+        tokens = self.get_tokens()
+        directives = []
+        kept = 0  # Directives up to the last #include
+        for i, token in enumerate(tokens):
+            if token.spelling != '#' or (i and tokens[i - 1].line == token.line) or i + 1 == len(tokens):
+                continue
+            name = tokens[i + 1].spelling
+            if name in ('include', 'include_next', 'import'):
+                kept = len(directives)
+                continue
+            line = [t.spelling for t in tokens[i:] if t.line == token.line]
+            directives.append(' '.join(line))
+        return directives[:kept]
+    
+    def _register_node(self, node: ASTNode, in_main: bool):
+        """Assign a node id and record declaration/reference data for the edge table"""
+        node.node_id = len(self.nodes)
+        node.subtree_end = node.node_id + 1
+        self.nodes.append(node)
+        self.ref_targets.append(None)
+        if in_main:
+            self.main_file_ids.append(node.node_id)
+        
+        cursor = node.cursor
+        if not isinstance(cursor, clang.cindex.Cursor):
+            return  # Error placeholder nodes carry no libclang data
+        try:
+            kind = cursor.kind
+            if _is_declaration_kind(kind):
+                # Header parameters can never be referenced from the main file
+                if in_main or kind != clang.cindex.CursorKind.PARM_DECL:
+                    self._decl_index.setdefault(cursor, node)
+            elif in_main and kind != clang.cindex.CursorKind.TRANSLATION_UNIT:
+                referenced = cursor.referenced
+                if referenced is not None:
+                    self._pending_refs.append((node.node_id, referenced))
+        except Exception:
+            pass
+    
+    def _cursor_file(self, cursor: clang.cindex.Cursor) -> Optional[str]:
+        """Name of the file a (top-level) cursor is located in, as libclang spells it"""
+        try:
+            loc_file = cursor.location.file
+            return loc_file.name if loc_file else None
+        except Exception:
+            return None
+    
+    def _is_main_path(self, path: str) -> bool:
+        """Check whether a libclang file name refers to the parsed main file"""
+        result = self._main_path_cache.get(path)
+        if result is None:
+            result = self._main_path_cache[path] = bool(self._main_file) and os.path.abspath(path) == self._main_file
+        return result
+    
+    def _resolve_references(self):
+        """Turn the references collected while building into edges"""
+        shared_usrs = None  # Declarations in reused header subtrees, by USR
+        for node_id, referenced in self._pending_refs:
+            target = None
+            try:
+                # Prefer the definition so go-to-definition lands on the body
+                definition = referenced.get_definition()
+                if definition is not None:
+                    target = self._decl_index.get(definition)
+            except Exception:
+                pass
+            if target is None:
+                target = self._decl_index.get(referenced)
+            if target is None and self._reused_positions:
+                if shared_usrs is None:
+                    shared_usrs = {}
+                    for subtree in self._header_subtrees:
+                        if subtree.nodes and subtree.nodes[0] in self._reused_positions:
+                            shared_usrs.update(subtree.usr_index())
+                try:
+                    target = shared_usrs.get(referenced.get_usr())
+                except Exception:
+                    pass
+            if target is None or target is self.nodes[node_id]:
+                continue  # Target is outside the tree (e.g. a builtin)
+            
+            self.ref_targets[node_id] = target
+            # Implicit-cast wrappers would list every use twice
+            if self.nodes[node_id].cursor.kind != clang.cindex.CursorKind.UNEXPOSED_EXPR:
+                self.referenced_by.setdefault(target, []).append(node_id)
+        self._pending_refs = []
+    
+    def _make_error_node(self, error: Exception, cursor, parent: Optional[ASTNode], index: int) -> ASTNode:
+        """Create a placeholder node for a cursor that could not be processed"""
+        error_cursor = type('ErrorCursor', (), {
+            'kind': clang.cindex.CursorKind.UNEXPOSED_EXPR,
+            'spelling': f"<Error: {str(error)}>",
+            'displayname': f"<Parse Error>",
+            'location': cursor.location if hasattr(cursor, 'location') else None,
+            'type': None,
+            'is_definition': lambda: False,
+            'is_declaration': lambda: False,
+            'get_children': lambda: [],
+            'get_tokens': lambda: [],
+        })()
+        error_node = ASTNode(error_cursor, parent, index)
+        self._register_node(error_node, False)
+        return error_node
+    
+    def _build_tree(self, cursor: clang.cindex.Cursor, parent=None, index=0, in_main=False) -> ASTNode:
         """Recursively build tree of ASTNode objects"""
         try:
             node = ASTNode(cursor, parent, index)
+            self._register_node(node, in_main)
             
             # Safely iterate through children
             try:
                 for i, child in enumerate(cursor.get_children()):
                     try:
-                        child_node = self._build_tree(child, node, i)
+                        child_node = self._build_tree(child, node, i, in_main)
                         node.children.append(child_node)
                     except Exception as e:
                         # Create an error node for problematic children
-                        error_cursor = type('ErrorCursor', (), {
-                            'kind': clang.cindex.CursorKind.UNEXPOSED_EXPR,
-                            'spelling': f"<Error: {str(e)}>",
-                            'displayname': f"<Parse Error>",
-                            'location': child.location if hasattr(child, 'location') else None,
-                            'type': None,
-                            'is_definition': lambda: False,
-                            'is_declaration': lambda: False,
-                            'get_children': lambda: [],
-                            'get_tokens': lambda: [],
-                        })()
-                        error_node = ASTNode(error_cursor, node, i)
-                        node.children.append(error_node)
+                        node.children.append(self._make_error_node(e, child, node, i))
                         print(f"Warning: Skipped problematic node at child {i}: {str(e)}")
             except Exception as e:
                 print(f"Warning: Could not iterate children of {cursor.kind}: {str(e)}")
-                
-            return node
             
+            node.subtree_end = len(self.nodes)
+            return node
+        
         except Exception as e:
             print(f"Warning: Could not create node for cursor {cursor.kind}: {str(e)}")
             # Return a minimal error node
-            error_cursor = type('ErrorCursor', (), {
-                'kind': clang.cindex.CursorKind.UNEXPOSED_EXPR,
-                'spelling': f"<Error: {str(e)}>",
-                'displayname': f"<Parse Error>",
-                'location': None,
-                'type': None,
-                'is_definition': lambda: False,
-                'is_declaration': lambda: False,
-                'get_children': lambda: [],
-                'get_tokens': lambda: [],
-            })()
-            return ASTNode(error_cursor, parent, index)
+            return self._make_error_node(e, None, parent, index)
     
     def find_node_by_path(self, path: List[int]) -> Optional[ASTNode]:
         """Find a node by its path (list of child indices)"""
         if not self.root_node or not path:
             return self.root_node
-            
+        
         current = self.root_node
         for index in path:
             if index < len(current.children):
@@ -271,38 +916,43 @@ class ASTBackend:
                 return None
         return current
     
+    def get_parent(self, node: ASTNode) -> Optional[ASTNode]:
+        """Get a node's parent in this backend's tree (shared header nodes hang off our root)"""
+        if node in self._shared_positions:
+            return self.root_node
+        return node.parent
+    
     def get_node_path(self, node: ASTNode) -> List[int]:
         """Get the path to a node (list of child indices from root)"""
         path = []
         current = node
-        while current.parent:
+        while current is not None:
+            if current in self._shared_positions:
+                path.insert(0, self._shared_positions[current])
+                break
+            if current.parent is None:
+                break
             path.insert(0, current.index)
             current = current.parent
         return path
     
-    def search_nodes(self, predicate) -> List[ASTNode]:
-        """Search for nodes matching a predicate function"""
-        results = []
-        
-        def visit(node):
-            if predicate(node):
-                results.append(node)
-            for child in node.children:
-                visit(child)
-                
-        if self.root_node:
-            visit(self.root_node)
-        return results
+    def query(self) -> NodeQuery:
+        """Lazy query over every node of the current tree"""
+        return NodeQuery(self.root_node)
     
-    def get_nodes_by_kind(self, kind: clang.cindex.CursorKind) -> List[ASTNode]:
+    def search_nodes(self, predicate) -> NodeQuery:
+        """Search for nodes matching a predicate function (evaluated lazily)"""
+        return self.query().filter(predicate)
+    
+    def get_nodes_by_kind(self, kind: clang.cindex.CursorKind) -> NodeQuery:
         """Get all nodes of a specific cursor kind"""
-        return self.search_nodes(lambda node: node.cursor.kind == kind)
+        return self.query().of_kind(kind)
     
-    def get_variables(self) -> List[ASTNode]:
+    def get_variables(self) -> NodeQuery:
         """Get all variable declarations"""
         return self.get_nodes_by_kind(clang.cindex.CursorKind.VAR_DECL)
     
-    def get_functions(self) -> List[ASTNode]:
+    def get_functions(self) -> NodeQuery:
         """Get all function declarations"""
         return self.get_nodes_by_kind(clang.cindex.CursorKind.FUNCTION_DECL)
     
@@ -326,15 +976,15 @@ class ASTBackend:
                 # Check if location is within the extent
                 if target_line < start_line or target_line > end_line:
                     return False
-                    
+                
                 if target_line == start_line and target_col < start_col:
                     return False
-                    
+                
                 if target_line == end_line and target_col > end_col:
                     return False
-                    
+                
                 return True
-            except:
+            except Exception:
                 return False
         
         def find_most_specific(node: ASTNode, target_line: int, target_col: int) -> Optional[ASTNode]:
@@ -351,4 +1001,94 @@ class ASTBackend:
             # If no child contains the location, this node is the most specific
             return node
         
-        return find_most_specific(self.root_node, line, column)
\ No newline at end of file
+        return find_most_specific(self.root_node, line, column)
+    
+    def owns_node(self, node: ASTNode) -> bool:
+        """Check whether a node was built by this backend's current parse (not a shared header node)"""
+        return 0 <= node.node_id < len(self.nodes) and self.nodes[node.node_id] is node
+    
+    def get_definition(self, node: ASTNode) -> Optional[ASTNode]:
+        """Get the declaration/definition a node refers to (precomputed, O(1))"""
+        if not self.owns_node(node):
+            return None
+        return self.ref_targets[node.node_id]
+    
+    def get_references(self, node: ASTNode) -> List[ASTNode]:
+        """Get all main-file nodes that use the declaration behind a node (precomputed, O(1))"""
+        decl = node
+        if decl not in self.referenced_by and self.owns_node(node) and self.ref_targets[node.node_id]:
+            # A use was selected - list the uses of the declaration it points at
+            decl = self.ref_targets[node.node_id]
+        return [self.nodes[i] for i in self.referenced_by.get(decl, [])]
+    
+    def get_cached(self, key: str, factory):
+        """Return derived data for the current parse, computing it on first use
+        
+        Safe to call from the console worker thread: the factory runs without
+        a lock (two threads may both compute it; the first result wins), and
+        the result goes into the cache of the parse it was computed for even
+        if commit_parse swaps in a newer parse meanwhile.
+        """
+        derived = self._derived
+        if key in derived:
+            return derived[key]
+        return derived.setdefault(key, factory())
+    
+    def get_tokens(self) -> List[TokenInfo]:
+        """Get all main-file tokens of the current translation unit (cached per parse)"""
+        def tokenize():
+            if not self.translation_unit:
+                return []
+            tokens = []
+            for token in self.translation_unit.get_tokens(extent=self.translation_unit.cursor.extent):
+                location = token.location
+                tokens.append(TokenInfo(location.offset, location.line, location.column,
+                                        token.kind.name, token.spelling))
+            return tokens
+        return self.get_cached('tokens', tokenize)
+    
+    def get_line_map(self) -> LineNodeMap:
+        """Get the line -> node map of the main file (cached per parse)"""
+        return self.get_cached('line_map', lambda: LineNodeMap(self))
+    
+    def get_include_files(self) -> List[str]:
+        """Absolute paths of the main file and every file it includes, directly or not (cached per parse)"""
+        def collect():
+            if not self.translation_unit:
+                return []
+            files = [os.path.abspath(self.current_file)]
+            seen = set(files)
+            for inclusion in self.translation_unit.get_includes():
+                # realpath, not abspath: libclang spells headers like '/../lib/gcc/.../../../include/...',
+                # where collapsing '..' textually would name a nonexistent file
+                path = os.path.realpath(inclusion.include.name)
+                if path not in seen:
+                    seen.add(path)
+                    files.append(path)
+            return files
+        return self.get_cached('include_files', collect)
+    
+    def invalidate_files(self, paths) -> str:
+        """Drop cached data of changed files before a reparse
+        
+        Stored header subtrees (with the search texts and symbols derived
+        from them) are forgotten only for the headers that changed; every
+        other header is reused by the next parse, so a change to the main
+        file alone rebuilds nothing but the main file's nodes. Returns
+        'main' when only the main file changed, 'headers' otherwise.
+        """
+        main_file = os.path.abspath(self.current_file) if self.current_file else None
+        headers = [path for path in paths if os.path.abspath(path) != main_file]
+        for path in headers:
+            self.header_store.invalidate(path)
+        return 'headers' if headers else 'main'
+    
+    def get_tokens_in_extent(self, extent) -> List[TokenInfo]:
+        """Get the cached main-file tokens covered by a (main-file) source extent"""
+        tokens = self.get_tokens()
+        offsets = self.get_cached('token_offsets', lambda: [t.offset for t in tokens])
+        try:
+            start, end = extent.start.offset, extent.end.offset
+        except Exception:
+            return []
+        return tokens[bisect_left(offsets, start):bisect_left(offsets, end)]
@@ -3,28 +3,72 @@
 Clang AST Explorer - Interactive GUI application for exploring C++ ASTs
 """
 
+import time
+_PROCESS_START = time.perf_counter()
+
+import os
 import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import clang.cindex
-import clang_config  # This will auto-configure libclang
-from ast_backend import ASTBackend
-from ast_ui import ASTExplorerUI
+
+DEFAULT_FILES = ["test/long_short.cpp", "test/long_division.cpp", "test/monitor_test.cpp"]
+
+class StartupProfiler:
+    """Collects timestamps of the startup phases for --profile-startup"""
+    
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.marks = []
+        self.reported = False
+    
+    def mark(self, label: str):
+        if self.enabled:
+            self.marks.append((label, time.perf_counter()))
+    
+    def report(self):
+        """Print the phase timings once (relative to interpreter start of this module)"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        print("Startup profile:")
+        previous = _PROCESS_START
+        for label, stamp in self.marks:
+            print(f"  {label:<28} +{(stamp - previous) * 1000:7.1f} ms   "
+                  f"at {(stamp - _PROCESS_START) * 1000:7.1f} ms")
+            previous = stamp
 
 class ASTExplorer:
-    def __init__(self):
+    def __init__(self, initial_file: str = None, profile_startup: bool = False):
+        self.profiler = StartupProfiler(profile_startup)
+        self.initial_file = initial_file
+        
         self.root = tk.Tk()
         self.root.title("Clang AST Explorer")
         self.root.geometry("1200x800")
+        self.profiler.mark("Tk root")
+        
+        # Show the window at once with a placeholder while the rest is set up
+        placeholder = ttk.Label(self.root, text="Loading Clang AST Explorer...", anchor='center')
+        placeholder.pack(fill='both', expand=True)
+        self.root.update()
+        self.profiler.mark("window shown")
+        
+        # Heavy modules (clang bindings, UI) are imported only once the window is up
+        from ast_backend import ASTBackend
+        from ast_ui import ASTExplorerUI
+        self.profiler.mark("imports")
         
         # Initialize backend
         self.backend = ASTBackend()
+        self.profiler.mark("backend")
         
         # Initialize UI
+        placeholder.destroy()
         self.ui = ASTExplorerUI(self.root, self.backend)
         
         # Setup menu
         self.setup_menu()
+        self.profiler.mark("UI built")
         
     def setup_menu(self):
         menubar = tk.Menu(self.root)
@@ -39,8 +83,14 @@ class ASTExplorer:
         view_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="View", menu=view_menu)
         view_menu.add_command(label="Expand All", command=self.ui.expand_all)
+        view_menu.add_command(label="Expand to Level...", command=self.ui.expand_to_level)
+        view_menu.add_command(label="Expand Selected Subtree", command=self.ui.expand_subtree)
         view_menu.add_command(label="Collapse All", command=self.ui.collapse_all)
         view_menu.add_separator()
+        view_menu.add_command(label="Go to Symbol...", command=self.ui.show_symbol_palette,
+                              accelerator="Ctrl+P")
+        self.root.bind_all('<Control-p>', lambda e: self.ui.show_symbol_palette())
+        view_menu.add_separator()
         view_menu.add_command(label="Toggle Source Position (Left/Right)", command=self.ui.toggle_source_position)
         
         file_menu.add_separator()
@@ -52,6 +102,15 @@ class ASTExplorer:
         tools_menu.add_checkbutton(label="Auto-Monitor File Changes", 
                                    command=self.toggle_file_monitoring,
                                    variable=tk.BooleanVar(value=True))  # Default enabled
+        self.edit_mode_var = tk.BooleanVar(value=False)
+        tools_menu.add_checkbutton(label="Live Edit Mode (parse the buffer, no saving)",
+                                   command=self.toggle_edit_mode,
+                                   variable=self.edit_mode_var)
+        self.auto_reload_var = tk.BooleanVar(value=self.ui.auto_reload)
+        tools_menu.add_checkbutton(label="Auto-Reload on Change (no prompt)",
+                                   command=self.toggle_auto_reload,
+                                   variable=self.auto_reload_var)
+        tools_menu.add_command(label="Reload Latency...", command=self.ui.show_reload_latency)
         
     def open_file(self):
         filename = filedialog.askopenfilename(
@@ -64,6 +123,7 @@ class ASTExplorer:
                 self.backend.parse_file(filename)
                 self.ui.populate_ast_tree()
                 self.ui.update_status(f"Loaded: {filename}")
+                self._remember_last_file(filename)
             except Exception as e:
                 error_msg = str(e)
                 if "Unknown template argument kind" in error_msg:
@@ -108,20 +168,70 @@ class ASTExplorer:
             else:
                 messagebox.showinfo("No File", "No file is currently loaded to monitor.")
     
+    def toggle_edit_mode(self):
+        """Toggle live editing of the source panel"""
+        self.ui.set_edit_mode(self.edit_mode_var.get())
+        self.edit_mode_var.set(self.ui.edit_mode)  # Refused without a loaded file
+    
+    def toggle_auto_reload(self):
+        """Toggle reloading changed files in the background without the dialog"""
+        self.ui.set_auto_reload(self.auto_reload_var.get())
+    
+    def _remember_last_file(self, filename: str):
+        """Store the file so the next start opens it"""
+        import clang_config
+        clang_config.save_user_config(last_file=os.path.abspath(filename))
+    
+    def _startup_candidates(self) -> list:
+        """Files to try at startup: command line, then last opened file, then the samples"""
+        if self.initial_file:
+            return [self.initial_file]
+        import clang_config
+        candidates = []
+        last_file = clang_config.load_user_config().get('last_file')
+        if last_file and os.path.exists(last_file):
+            candidates.append(last_file)
+        return candidates + [f for f in DEFAULT_FILES if os.path.exists(f)]
+    
+    def _load_initial_file(self, candidates: list):
+        """Parse the first loadable candidate in the background"""
+        if not candidates:
+            self.ui.update_status("Ready")
+            self.profiler.report()
+            return
+        filename = candidates[0]
+        
+        def on_done(error):
+            if error is None:
+                self.profiler.mark("first file shown")
+                self.profiler.report()
+                if filename != self.initial_file:
+                    self._remember_last_file(filename)
+            else:
+                self._load_initial_file(candidates[1:])
+        
+        self.ui.load_file_async(filename, on_done=on_done)
+    
     def run(self):
-        # Load default file if available
-        default_files = ["test/long_short.cpp", "test/long_division.cpp", "test/monitor_test.cpp"]
-        for filename in default_files:
-            try:
-                self.backend.parse_file(filename)
-                self.ui.populate_ast_tree()
-                self.ui.update_status(f"Loaded: {filename}")
-                break
-            except:
-                continue
+        # Draw the full UI before any parsing happens
+        self.root.update()
+        self.profiler.mark("UI shown")
+        
+        # Load the last/default file afterwards, off the UI thread
+        self.root.after(1, lambda: self._load_initial_file(self._startup_candidates()))
         
         self.root.mainloop()
 
+def main(argv: list = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Clang AST Explorer")
+    parser.add_argument('file', nargs='?', help="C/C++ file to open (default: last opened file)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Print a timing report of the startup phases")
+    options = parser.parse_args(argv)
+    
+    app = ASTExplorer(initial_file=options.file, profile_startup=options.profile_startup)
+    app.run()
+
 if __name__ == "__main__":
-    app = ASTExplorer()
-    app.run()
\ No newline at end of file
+    main()
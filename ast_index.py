@@ -0,0 +1,317 @@
+"""
+AST Index - Search structures built once per parse over an ASTBackend tree
+"""
+
+import heapq
+import clang.cindex
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from typing import Dict, Iterator, List, Optional, Tuple
+from ast_backend import ASTBackend, ASTNode
+
+def _search_text(node: ASTNode) -> Optional[str]:
+    """Lowercased spelling, display name and type spelling of a node, NUL-separated"""
+    cursor = node.cursor
+    if not isinstance(cursor, clang.cindex.Cursor):
+        return None
+    try:
+        spelling = cursor.spelling or ""
+        display_name = cursor.displayname or ""
+        type_spelling = cursor.type.spelling or ""
+    except Exception:
+        return None
+    if not (spelling or display_name or type_spelling):
+        return None
+    return NodeSearchIndex.SEPARATOR.join((spelling, display_name, type_spelling)).lower()
+
+def _subtree_texts(top: ASTNode) -> List[Tuple[ASTNode, str]]:
+    """(node, search text) pairs of a subtree in pre-order"""
+    pairs = []
+    stack = [top]
+    while stack:
+        node = stack.pop()
+        stack.extend(reversed(node.children))
+        text = _search_text(node)
+        if text is not None:
+            pairs.append((node, text))
+    return pairs
+
+def _tree_texts(backend: ASTBackend) -> Iterator[Tuple[ASTNode, str]]:
+    """(node, search text) pairs of the displayed tree in pre-order
+    
+    Texts of shared header subtrees are computed once and cached on the
+    subtree, so a reparse only pays libclang calls for the main file and
+    headers that changed.
+    """
+    root = backend.root_node
+    if root is None:
+        return
+    shared = {}
+    for subtree in backend._header_subtrees:
+        for top in subtree.nodes:
+            shared[top] = subtree
+    
+    text = _search_text(root)
+    if text is not None:
+        yield root, text
+    for top in root.children:
+        subtree = shared.get(top)
+        if subtree is None:
+            yield from _subtree_texts(top)
+        else:
+            texts = subtree.get_cached('search_texts', lambda: {n: _subtree_texts(n) for n in subtree.nodes})
+            yield from texts[top]
+
+class NodeSearchIndex:
+    """Substring search over node spellings, display names and type spellings
+
+    Nodes sharing the same search text are grouped, so the index is built
+    over the distinct texts only. Queries of three or more characters use a
+    trigram index (the rarest trigram of the query gives the candidates,
+    which are then verified); shorter queries scan the distinct texts.
+    Either way a node matches when a field contains the query.
+    """
+
+    SEPARATOR = '\x00'  # Keeps matches from spanning two fields
+
+    def __init__(self, backend: ASTBackend):
+        self.texts: List[str] = []               # Distinct lowercased search texts
+        self.text_nodes: List[List[ASTNode]] = []  # Nodes per text, in tree order
+        self.trigrams: Dict[str, array] = {}     # Trigram -> ascending text ids
+        self.node_count = 0
+        self._build(backend)
+
+    def _build(self, backend: ASTBackend):
+        text_ids: Dict[str, int] = {}
+        for node, text in _tree_texts(backend):
+            text_id = text_ids.get(text)
+            if text_id is None:
+                text_id = text_ids[text] = len(self.texts)
+                self.texts.append(text)
+                self.text_nodes.append([])
+                for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                    if self.SEPARATOR not in trigram:
+                        self.trigrams.setdefault(trigram, array('i')).append(text_id)
+            self.text_nodes[text_id].append(node)
+            self.node_count += 1
+
+    def search(self, query: str, limit: int = 200) -> List[ASTNode]:
+        """Nodes whose spelling, display name or type contains the query (case-insensitive)"""
+        return self.search_with_total(query, limit)[0]
+
+    def search_with_total(self, query: str, limit: int = 200):
+        """Like search(), also returning the number of matching nodes found before the limit cut"""
+        query = query.lower()
+        if not query:
+            return [], 0
+
+        if len(query) < 3:
+            text_ids = self._scan_candidates(query)
+            verify = False
+        else:
+            text_ids = self._trigram_candidates(query)
+            verify = True
+
+        matches = []
+        total = 0
+        for text_id in text_ids:
+            if verify and query not in self.texts[text_id]:
+                continue
+            nodes = self.text_nodes[text_id]
+            total += len(nodes)
+            if len(matches) < limit:
+                matches.extend(nodes[:limit - len(matches)])
+        return matches, total
+
+    def _trigram_candidates(self, query: str):
+        """Text ids holding the query's rarest trigram (a superset of the matches)"""
+        postings = []
+        for i in range(len(query) - 2):
+            posting = self.trigrams.get(query[i:i + 3])
+            if posting is None:
+                return []
+            postings.append(posting)
+        return min(postings, key=len)
+
+    def _scan_candidates(self, query: str):
+        """Text ids containing the (short) query, in ascending order"""
+        return [text_id for text_id, text in enumerate(self.texts) if query in text]
+
+def get_search_index(backend: ASTBackend) -> NodeSearchIndex:
+    """Search index of the current parse (built on first use, then cached)"""
+    return backend.get_cached('search_index', lambda: NodeSearchIndex(backend))
+
+# Declaration kinds listed in the symbol palette, with their labels
+SYMBOL_KINDS = {
+    clang.cindex.CursorKind.FUNCTION_DECL: 'function',
+    clang.cindex.CursorKind.FUNCTION_TEMPLATE: 'function',
+    clang.cindex.CursorKind.CXX_METHOD: 'method',
+    clang.cindex.CursorKind.CONSTRUCTOR: 'method',
+    clang.cindex.CursorKind.DESTRUCTOR: 'method',
+    clang.cindex.CursorKind.CLASS_DECL: 'class',
+    clang.cindex.CursorKind.STRUCT_DECL: 'class',
+    clang.cindex.CursorKind.UNION_DECL: 'class',
+    clang.cindex.CursorKind.CLASS_TEMPLATE: 'class',
+    clang.cindex.CursorKind.ENUM_DECL: 'enum',
+    clang.cindex.CursorKind.TYPEDEF_DECL: 'type',
+    clang.cindex.CursorKind.TYPE_ALIAS_DECL: 'type',
+    clang.cindex.CursorKind.VAR_DECL: 'variable',
+    clang.cindex.CursorKind.FIELD_DECL: 'field',
+}
+
+# Symbol kinds that never contain other listed symbols (their subtrees are skipped)
+_LEAF_SYMBOL_LABELS = {'variable', 'field', 'type'}
+
+Symbol = namedtuple('Symbol', ['name', 'kind', 'path', 'line', 'column', 'node'])
+
+def _collect_symbols(top: ASTNode, in_main: bool) -> List[Symbol]:
+    """Symbols declared in a subtree; function bodies are not entered (locals are not listed)"""
+    symbols = []
+    stack = [top]
+    while stack:
+        node = stack.pop()
+        cursor = node.cursor
+        if not isinstance(cursor, clang.cindex.Cursor):
+            continue
+        try:
+            label = SYMBOL_KINDS.get(cursor.kind)
+            if label is not None:
+                name = cursor.spelling
+                # Reserved names (__foo, _Bar) are library internals
+                if name and (in_main or not name.lstrip('~').startswith('_')):
+                    location = cursor.location
+                    path = location.file.name if location.file else ""
+                    symbols.append(Symbol(name, label, path, location.line, location.column, node))
+                if label in _LEAF_SYMBOL_LABELS or label in ('function', 'method'):
+                    continue
+        except Exception:
+            continue
+        stack.extend(reversed(node.children))
+    return symbols
+
+def _macro_symbols(backend: ASTBackend) -> List[Symbol]:
+    """#define'd names of the main file, found in the cached token stream (they have no cursor)"""
+    symbols = []
+    tokens = backend.get_tokens()
+    for i in range(len(tokens) - 2):
+        if tokens[i].spelling == '#' and tokens[i + 1].spelling == 'define' \
+                and tokens[i + 2].line == tokens[i].line:
+            name = tokens[i + 2]
+            symbols.append(Symbol(name.spelling, 'macro', backend.current_file or "",
+                                  name.line, name.column, None))
+    return symbols
+
+def _char_mask(text: str) -> int:
+    """Bit set of the characters in a (lowercased) text, folded to 64 bits"""
+    mask = 0
+    for char in text:
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+def fuzzy_score(query: str, name: str) -> Optional[int]:
+    """Score how well a lowercased query matches a name as a subsequence (None = no match)
+
+    Rewards a match at the start, characters at word starts (after '_' or ':',
+    or a lower-to-upper case change) and runs of consecutive characters;
+    penalizes gaps and long names.
+    """
+    lowered = name.lower()
+    if lowered.startswith(query):
+        return 1000 - len(name)
+    score = 0
+    position = -1
+    previous = -2
+    for char in query:
+        position = lowered.find(char, position + 1)
+        if position < 0:
+            return None
+        if position == 0 or name[position - 1] in '_:' or \
+                (name[position].isupper() and name[position - 1].islower()):
+            score += 30
+        if position == previous + 1:
+            score += 15
+        else:
+            score -= min(position - previous - 1, 10)
+        previous = position
+    return score - len(name) // 4
+
+class SymbolTable:
+    """Symbols of the current parse for the go-to-symbol palette
+
+    Entries are sorted by lowercased name once. A query with enough prefix
+    matches is answered by bisecting the sorted names (prefix matches always
+    outrank other fuzzy matches). Otherwise candidates are narrowed with
+    per-symbol character masks before fuzzy scoring, and a keystroke that
+    extends the previous query only re-scores the previous matches.
+    """
+
+    def __init__(self, backend: ASTBackend):
+        symbols = list(_tree_symbols(backend))
+        symbols.extend(_macro_symbols(backend))
+        symbols.sort(key=lambda symbol: (symbol.name.lower(), symbol.path, symbol.line))
+        self.symbols: List[Symbol] = symbols
+        self.keys: List[str] = [symbol.name.lower() for symbol in symbols]
+        self.masks: List[int] = [_char_mask(key) for key in self.keys]
+        self._last_query = None
+        self._last_candidates: List[int] = []
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def search(self, query: str, limit: int = 50) -> List[Symbol]:
+        """Best fuzzy matches for a query, highest score first (empty query: first symbols by name)"""
+        query = query.lower().strip()
+        if not query:
+            self._last_query = None
+            return self.symbols[:limit]
+
+        # Plenty of prefix matches: the shortest names win, no scan needed
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + '\uffff', start)
+        if end - start >= limit:
+            self._last_query = None
+            symbols = self.symbols
+            best = heapq.nsmallest(limit, range(start, end), key=lambda i: (len(symbols[i].name), i))
+            return [symbols[i] for i in best]
+
+        if self._last_query and query.startswith(self._last_query):
+            candidates = self._last_candidates
+        else:
+            query_mask = _char_mask(query)
+            masks = self.masks
+            candidates = [i for i in range(len(masks)) if masks[i] & query_mask == query_mask]
+
+        scored = []
+        kept = []
+        symbols = self.symbols
+        for symbol_id in candidates:
+            score = fuzzy_score(query, symbols[symbol_id].name)
+            if score is not None:
+                kept.append(symbol_id)
+                scored.append((score, -symbol_id))
+        self._last_query = query
+        self._last_candidates = kept
+        return [symbols[-negated_id] for score, negated_id in heapq.nlargest(limit, scored)]
+
+def _tree_symbols(backend: ASTBackend) -> Iterator[Symbol]:
+    """Symbols of the displayed tree, header subtrees cached on the shared subtree"""
+    root = backend.root_node
+    if root is None:
+        return
+    shared = {}
+    for subtree in backend._header_subtrees:
+        for top in subtree.nodes:
+            shared[top] = subtree
+    for top in root.children:
+        subtree = shared.get(top)
+        if subtree is None:
+            path = backend._cursor_file(top.cursor)
+            yield from _collect_symbols(top, path is not None and backend._is_main_path(path))
+        else:
+            symbols = subtree.get_cached('symbols', lambda: {n: _collect_symbols(n, False) for n in subtree.nodes})
+            yield from symbols[top]
+
+def get_symbol_table(backend: ASTBackend) -> SymbolTable:
+    """Symbol table of the current parse (built on first use, then cached)"""
+    return backend.get_cached('symbol_table', lambda: SymbolTable(backend))
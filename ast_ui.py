@@ -3,22 +3,142 @@ AST UI - User interface components for the AST Explorer
 """
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, scrolledtext, messagebox, simpledialog
 import code
 import sys
 import os
+import re
 import time
-from io import StringIO
-from typing import Dict, Any, Optional
+import threading
+from bisect import bisect_left
+from collections import deque
+from difflib import SequenceMatcher
+from typing import Dict, Any, Optional, List, Tuple
 from ast_backend import ASTBackend, ASTNode
+import clang_config
+
+class TreePopulator:
+    """Inserts Treeview items in time-sliced batches so Tk stays responsive
+    
+    Work is queued per parent item. Each slice inserts items until its time
+    budget is spent, then yields back to the event loop with root.after().
+    """
+    
+    BATCH_SIZE = 32  # Items inserted between clock checks
+    
+    def __init__(self, tree: ttk.Treeview, insert_item, budget_ms: float = 8.0, on_progress=None):
+        self.tree = tree
+        self.insert_item = insert_item  # insert_item(parent_item, node) -> item id
+        self.budget = budget_ms / 1000.0
+        self.on_progress = on_progress  # on_progress(inserted, total)
+        self._tasks = {}  # Parent item -> [nodes, next index], in submission order
+        self._after_id = None
+        self.inserted = 0
+        self.total = 0
+    
+    def submit(self, parent_item: str, nodes: list):
+        """Queue nodes to be inserted under a parent item"""
+        if not nodes:
+            return
+        self._tasks[parent_item] = [nodes, 0]
+        self.total += len(nodes)
+        self._schedule()
+    
+    def is_pending(self, parent_item: str) -> bool:
+        return parent_item in self._tasks
+    
+    def pending_count(self, parent_item: str) -> int:
+        """Number of nodes still queued under a parent item"""
+        task = self._tasks.get(parent_item)
+        return len(task[0]) - task[1] if task else 0
+    
+    def take(self, parent_item: str) -> list:
+        """Remove a parent's queued nodes and return them (the caller inserts them)"""
+        task = self._tasks.pop(parent_item, None)
+        if task is None:
+            return []
+        nodes, index = task
+        self.total -= len(nodes) - index
+        self._report()
+        return nodes[index:]
+    
+    def flush(self, parent_item: str):
+        """Finish one parent's insertions right now (e.g. to reveal a node under it)"""
+        task = self._tasks.pop(parent_item, None)
+        if task is None:
+            return
+        nodes, index = task
+        for node in nodes[index:]:
+            self.insert_item(parent_item, node)
+        self.inserted += len(nodes) - index
+        self._report()
+    
+    def cancel(self):
+        """Drop all queued work (a newer parse replaced the tree)"""
+        if self._after_id is not None:
+            self.tree.after_cancel(self._after_id)
+            self._after_id = None
+        self._tasks.clear()
+        self.inserted = self.total = 0
+    
+    def _schedule(self):
+        if self._after_id is None and self._tasks:
+            self._after_id = self.tree.after(1, self._run_slice)
+    
+    def _run_slice(self):
+        """Insert items until the slice budget is used up"""
+        self._after_id = None
+        deadline = time.perf_counter() + self.budget
+        while self._tasks and time.perf_counter() < deadline:
+            parent_item = next(iter(self._tasks))
+            task = self._tasks[parent_item]
+            nodes, index = task
+            end = min(index + self.BATCH_SIZE, len(nodes))
+            try:
+                for node in nodes[index:end]:
+                    self.insert_item(parent_item, node)
+            except tk.TclError:
+                end = len(nodes)  # Parent item is gone
+            self.inserted += end - index
+            if end >= len(nodes):
+                del self._tasks[parent_item]
+            else:
+                task[1] = end
+        self._report()
+        self._schedule()
+    
+    def _report(self):
+        if self.on_progress:
+            self.on_progress(self.inserted, self.total)
+        if not self._tasks:
+            self.inserted = self.total = 0
 
 class ASTTreeView:
     """Tree view widget for displaying the AST structure"""
     
-    def __init__(self, parent, backend: ASTBackend, on_select_callback=None):
+    SYNC_INSERT_LIMIT = 200  # Larger child lists are streamed in by the TreePopulator
+    EXPAND_BUDGET = 20000    # Default cap on items Expand All / Expand Subtree may insert
+    EXPAND_CHUNK = 200       # Children inserted per step while expanding
+    
+    def __init__(self, parent, backend: ASTBackend, on_select_callback=None,
+                 expand_budget: int = EXPAND_BUDGET):
         self.backend = backend
         self.on_select_callback = on_select_callback
         self.node_map = {}  # Maps tree item ids to ASTNode objects
+        self.item_map = {}  # Reverse map: ASTNode (by identity) -> tree item id
+        self.placeholders = {}  # Item id -> dummy child of a node whose children aren't inserted yet
+        self.filtered = False  # True while show_matches() is displaying filter results
+        self.progress_callback = None
+        self.status_callback = None
+        self.filter_cleared_callback = None  # Called when the tree leaves filter mode on its own
+        
+        # Expand/collapse jobs run as generators advanced in time slices
+        self.expand_budget = expand_budget
+        self._job = None
+        self._job_after = None
+        self._job_label = None
+        self._job_truncated = False
+        self._job_steps = 0
         
         # Create frame and tree
         self.frame = ttk.Frame(parent)
@@ -39,28 +159,228 @@ class ASTTreeView:
         
         # Bind selection event
         self.tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        self.tree.tag_configure("match", foreground="#D97706")
+        
+        # Children are inserted lazily when a node is first expanded
+        self.tree.bind('<<TreeviewOpen>>', self._on_tree_open)
+        self.populator = TreePopulator(self.tree, self._add_node_to_tree,
+                                       on_progress=self._on_populate_progress)
+        
+        # Context menu for reference navigation
+        self.goto_definition_callback = None
+        self.find_references_callback = None
+        self.context_menu = tk.Menu(self.tree, tearoff=0)
+        self.context_menu.add_command(label="Go to Definition", command=self._context_goto_definition)
+        self.context_menu.add_command(label="Find All References", command=self._context_find_references)
+        self.context_menu.add_separator()
+        self.context_menu.add_command(label="Expand Subtree", command=self._context_expand_subtree)
+        self._context_node = None
+        self.tree.bind('<Button-3>', self._on_context_menu)
+        if sys.platform == 'darwin':
+            self.tree.bind('<Button-2>', self._on_context_menu)
         
     def populate(self):
         """Populate the tree with AST data"""
-        # Clear existing items
+        self._clear()
+        if not self.backend.root_node:
+            return
+            
+        # Add root and its children; deeper levels are inserted on expand
+        root_item = self._add_node_to_tree("", self.backend.root_node, open=True)
+        self._materialize(root_item)
+    
+    def _clear(self):
+        """Remove all items (and stop streaming items of the previous tree)"""
+        self.populator.cancel()
+        self.cancel_job()
         for item in self.tree.get_children():
             self.tree.delete(item)
         self.node_map.clear()
-        
-        if not self.backend.root_node:
+        self.item_map.clear()
+        self.placeholders.clear()
+        self.filtered = False
+    
+    def show_matches(self, matches):
+        """Show only the given nodes under their ancestor paths (filter mode)
+        
+        Ancestors are inserted open and hold just the matching branches; the
+        matched nodes themselves stay lazily expandable.
+        """
+        self._clear()
+        self.filtered = True
+        for node in matches:
+            if node in self.item_map:
+                self.tree.item(self.item_map[node], tags=("match",))
+                continue
+            
+            # Climb to an already inserted ancestor, then insert the path down to the match
+            path = []
+            current = self.backend.get_parent(node)
+            while current is not None and current not in self.item_map:
+                path.append(current)
+                current = self.backend.get_parent(current)
+            parent_item = self.item_map[current] if current is not None else ""
+            placeholder = self.placeholders.pop(parent_item, None)
+            if placeholder is not None:
+                self.tree.delete(placeholder)  # A match that is also an ancestor shows only matches
+            for ancestor in reversed(path):
+                parent_item = self.tree.insert(parent_item, "end", text=ancestor.display_name, open=True)
+                self.node_map[parent_item] = ancestor
+                self.item_map[ancestor] = parent_item
+            item_id = self._add_node_to_tree(parent_item, node)
+            self.tree.item(item_id, tags=("match",))
+    
+    def clear_filter(self):
+        """Leave filter mode and show the full tree again, keeping the selection"""
+        if not self.filtered:
             return
+        selection = self.tree.selection()
+        selected = self.node_map.get(selection[0]) if selection else None
+        self.populate()
+        if selected is not None:
+            self.select_and_reveal_node(selected)
+        
+    def patch(self) -> Optional[Tuple[int, int, int]]:
+        """Show the backend's new tree by updating the displayed items in place
+        
+        Children of open items are aligned with the new children by display
+        name (a structural diff); matched items are kept with their open
+        state and selection and re-pointed at the new nodes, and only the
+        differing runs are deleted or inserted. Collapsed items just get
+        their placeholder back. Returns (kept, inserted, deleted) item
+        counts, or None when the tree had to be repopulated.
+        """
+        root = self.backend.root_node
+        top_items = self.tree.get_children("")
+        if root is None or self.filtered or len(top_items) != 1 or self.populator.total or self._job:
+            self.populate()
+            return None
+        
+        node_map, item_map, placeholders = {}, {}, {}
+        kept = inserted = deleted = 0
+        stack = [(top_items[0], root)]
+        while stack:
+            item_id, node = stack.pop()
+            node_map[item_id] = node
+            item_map[node] = item_id
+            kept += 1
+            if self.tree.item(item_id, 'text') != node.display_name:
+                self.tree.item(item_id, text=node.display_name)
             
-        # Add root and its children
-        self._add_node_to_tree("", self.backend.root_node, open=True)
-        
-    def _add_node_to_tree(self, parent_id: str, node: ASTNode, open: bool = False):
-        """Recursively add nodes to the tree"""
+            placeholder = self.placeholders.get(item_id)
+            if placeholder is not None or not self.tree.item(item_id, 'open'):
+                # Children not shown: drop whatever was inserted, a placeholder is enough
+                children = self.tree.get_children(item_id)
+                if children:
+                    self.tree.delete(*children)
+                    deleted += len(children) - (placeholder is not None)
+                if node.children:
+                    placeholders[item_id] = self.tree.insert(item_id, "end", text="...")
+                continue
+            
+            old_items = self.tree.get_children(item_id)
+            old_names = [self.node_map[child].display_name for child in old_items]
+            new_names = [child.display_name for child in node.children]
+            matcher = SequenceMatcher(None, old_names, new_names, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == 'equal':
+                    for old_item, new_node in zip(old_items[i1:i2], node.children[j1:j2]):
+                        stack.append((old_item, new_node))
+                    continue
+                if i2 > i1:
+                    self.tree.delete(*old_items[i1:i2])
+                    deleted += i2 - i1
+                for position, new_node in enumerate(node.children[j1:j2], j1):
+                    child_item = self.tree.insert(item_id, position, text=new_node.display_name)
+                    node_map[child_item] = new_node
+                    item_map[new_node] = child_item
+                    if new_node.children:
+                        placeholders[child_item] = self.tree.insert(child_item, "end", text="...")
+                    inserted += 1
+        
+        self.node_map, self.item_map, self.placeholders = node_map, item_map, placeholders
+        return kept, inserted, deleted
+        
+    def _add_node_to_tree(self, parent_id: str, node: ASTNode, open: bool = False) -> str:
+        """Add a single node; a dummy child stands in for its children until it is expanded"""
         item_id = self.tree.insert(parent_id, "end", text=node.display_name, open=open)
         self.node_map[item_id] = node
+        self.item_map[node] = item_id
         
-        # Add children
-        for child in node.children:
-            self._add_node_to_tree(item_id, child, open=False)
+        if node.children:
+            self.placeholders[item_id] = self.tree.insert(item_id, "end", text="...")
+        return item_id
+    
+    def _materialize(self, item_id: str, sync: bool = False):
+        """Replace an item's dummy child with the real children (one level)
+        
+        Long child lists are handed to the populator unless sync is set.
+        """
+        placeholder = self.placeholders.pop(item_id, None)
+        if placeholder is None:
+            if sync:
+                self.populator.flush(item_id)
+            return
+        self.tree.delete(placeholder)
+        children = self.node_map[item_id].children
+        if sync or len(children) <= self.SYNC_INSERT_LIMIT:
+            for child in children:
+                self._add_node_to_tree(item_id, child)
+        else:
+            self.populator.submit(item_id, children)
+    
+    def set_progress_callback(self, callback):
+        """Set the callback receiving (inserted, total) while items stream in"""
+        self.progress_callback = callback
+    
+    def _on_populate_progress(self, inserted: int, total: int):
+        if self.progress_callback:
+            self.progress_callback(inserted, total)
+    
+    def _on_tree_open(self, event):
+        """Insert the children of the node being expanded"""
+        item_id = self.tree.focus()
+        if item_id:
+            self._materialize(item_id)
+    
+    def _item_for_node(self, node: ASTNode) -> Optional[str]:
+        """Find (inserting ancestors on demand) the tree item of a node
+        
+        In filter mode the inserted ancestors only hold the matching branches;
+        a node outside them is reached by leaving filter mode first.
+        """
+        item_id = self._find_item(node)
+        if item_id is None and self.filtered:
+            self.clear_filter()
+            self._notify("Filter cleared to show the node")
+            if self.filter_cleared_callback:
+                self.filter_cleared_callback()
+            item_id = self._find_item(node)
+        return item_id
+    
+    def _find_item(self, node: ASTNode) -> Optional[str]:
+        """Tree item of a node, materializing collapsed ancestor levels (None if unreachable)"""
+        item_id = self.item_map.get(node)
+        if item_id is not None:
+            return item_id
+        
+        # Climb to the nearest ancestor that already has an item...
+        missing = []
+        current = node
+        while current is not None and current not in self.item_map:
+            missing.append(current)
+            current = self.backend.get_parent(current)
+        if current is None:
+            return None  # Not part of the displayed tree
+        
+        # ...then insert the levels below it down to the node
+        item_id = self.item_map[current]
+        for ancestor in reversed(missing):
+            self._materialize(item_id, sync=True)
+            item_id = self.item_map.get(ancestor)
+            if item_id is None:
+                return None
+        return item_id
             
     def _on_tree_select(self, event):
         """Handle tree selection"""
@@ -71,57 +391,188 @@ class ASTTreeView:
             if node:
                 self.on_select_callback(node)
                 
-    def expand_all(self):
-        """Expand all tree items"""
-        def expand_item(item_id):
-            self.tree.item(item_id, open=True)
-            for child in self.tree.get_children(item_id):
-                expand_item(child)
+    def set_reference_callbacks(self, goto_definition, find_references):
+        """Set the callbacks used by the Go to Definition / Find All References menu"""
+        self.goto_definition_callback = goto_definition
+        self.find_references_callback = find_references
+    
+    def _on_context_menu(self, event):
+        """Show the reference navigation menu for the item under the mouse"""
+        item_id = self.tree.identify_row(event.y)
+        node = self.node_map.get(item_id)
+        if not node:
+            return
+        self._context_node = node
+        self.tree.selection_set(item_id)
+        
+        has_definition = self.backend.get_definition(node) is not None
+        has_references = bool(self.backend.get_references(node))
+        self.context_menu.entryconfigure(0, state='normal' if has_definition else 'disabled')
+        self.context_menu.entryconfigure(1, state='normal' if has_references else 'disabled')
+        self.context_menu.entryconfigure(3, state='normal' if node.children else 'disabled')
+        try:
+            self.context_menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            self.context_menu.grab_release()
+    
+    def _context_goto_definition(self):
+        """Context menu: jump to the declaration the node refers to"""
+        if self._context_node and self.goto_definition_callback:
+            self.goto_definition_callback(self._context_node)
+    
+    def _context_find_references(self):
+        """Context menu: list every use of the node's declaration"""
+        if self._context_node and self.find_references_callback:
+            self.find_references_callback(self._context_node)
+    
+    def _context_expand_subtree(self):
+        """Context menu: expand everything below the node"""
+        if self._context_node:
+            self.expand_subtree(self.item_map.get(self._context_node))
                 
-        for item in self.tree.get_children():
-            expand_item(item)
+    def expand_all(self):
+        """Expand every item, stopping once the expand budget of inserted items is used up"""
+        roots = self.tree.get_children()
+        self._start_job(self._expand_steps(roots, None, self.expand_budget), "Expand All")
+    
+    def expand_to_level(self, level: int):
+        """Expand the tree so that nodes down to the given depth are visible (root = level 0)"""
+        roots = self.tree.get_children()
+        self._start_job(self._expand_steps(roots, max(0, level), None), f"Expand to level {level}")
+    
+    def expand_subtree(self, item_id: Optional[str] = None):
+        """Expand everything below an item (default: the selected one) within the expand budget"""
+        if item_id is None:
+            selection = self.tree.selection()
+            if not selection:
+                return
+            item_id = selection[0]
+        if item_id not in self.node_map:
+            return
+        self._start_job(self._expand_steps([item_id], None, self.expand_budget), "Expand Subtree")
             
     def collapse_all(self):
         """Collapse all tree items"""
-        def collapse_item(item_id):
-            self.tree.item(item_id, open=False)
-            for child in self.tree.get_children(item_id):
-                collapse_item(child)
-                
-        for item in self.tree.get_children():
-            self.tree.item(item, open=True)  # Keep root open
-            for child in self.tree.get_children(item):
-                collapse_item(child)
-                
+        self._start_job(self._collapse_steps(), None)
+    
+    def _expand_steps(self, items, max_depth: Optional[int], budget: Optional[int]):
+        """Breadth-first expansion, one item per step; depths are relative to the start items
+        
+        Long child lists (and children still queued in the populator) are
+        inserted EXPAND_CHUNK at a time, yielding False between chunks so a
+        single wide node can't overrun a time slice.
+        """
+        queue = deque((item_id, 0) for item_id in items)
+        inserted = 0
+        while queue:
+            item_id, depth = queue.popleft()
+            node = self.node_map.get(item_id)
+            if node is None or not node.children:
+                continue
+            if max_depth is not None and depth >= max_depth:
+                continue
+            if item_id in self.placeholders:
+                cost = len(node.children)
+            else:
+                cost = self.populator.pending_count(item_id)
+            if budget is not None and inserted + cost > budget:
+                self._job_truncated = True
+                return
+            inserted += cost
+            
+            if item_id in self.placeholders:
+                self.tree.delete(self.placeholders.pop(item_id))
+                remaining = node.children
+            else:
+                remaining = self.populator.take(item_id)
+            self.tree.item(item_id, open=True)
+            for start in range(0, len(remaining), self.EXPAND_CHUNK):
+                if start:
+                    yield False
+                for child in remaining[start:start + self.EXPAND_CHUNK]:
+                    self._add_node_to_tree(item_id, child)
+            queue.extend((child, depth + 1) for child in self.tree.get_children(item_id))
+            yield True
+    
+    def _collapse_steps(self):
+        """Close every open item below the root, one item per step (only inserted items exist)"""
+        for root_item in self.tree.get_children():
+            self.tree.item(root_item, open=True)  # Keep root open
+            stack = list(self.tree.get_children(root_item))
+            while stack:
+                item_id = stack.pop()
+                if item_id in self.placeholders:
+                    continue  # Children were never inserted
+                self.tree.item(item_id, open=False)
+                stack.extend(self.tree.get_children(item_id))
+                yield
+    
+    def _start_job(self, steps, label: Optional[str]):
+        """Run an expand/collapse generator in time slices, replacing any running job"""
+        self.cancel_job()
+        self._job = steps
+        self._job_label = label
+        self._job_truncated = False
+        self._job_steps = 0
+        self._job_after = self.tree.after(1, self._run_job_slice)
+    
+    def cancel_job(self):
+        """Stop a running expand/collapse job"""
+        if self._job_after is not None:
+            self.tree.after_cancel(self._job_after)
+            self._job_after = None
+        self._job = None
+    
+    def _run_job_slice(self):
+        """Advance the current job until the populator's slice budget is spent"""
+        self._job_after = None
+        if self._job is None:
+            return
+        deadline = time.perf_counter() + self.populator.budget
+        try:
+            while time.perf_counter() < deadline:
+                if next(self._job) is not False:  # False: part of a long child list
+                    self._job_steps += 1
+        except StopIteration:
+            self._job = None
+            self._finish_job()
+            return
+        except tk.TclError:
+            self._job = None  # Items were deleted underneath us (tree repopulated)
+            return
+        if self._job_label:
+            self._notify(f"{self._job_label}: {self._job_steps} items opened...")
+        self._job_after = self.tree.after(1, self._run_job_slice)
+    
+    def _finish_job(self):
+        if not self._job_label:
+            return
+        if self._job_truncated:
+            message = (f"{self._job_label} stopped after opening {self._job_steps} items: "
+                       f"the budget of {self.expand_budget} inserted nodes was reached. "
+                       "Use Expand Subtree or Expand to Level on the part you need.")
+            self._notify(message)
+            messagebox.showwarning("Expand limit reached", message)
+        else:
+            self._notify(f"{self._job_label}: done")
+    
+    def set_status_callback(self, callback):
+        """Set the callback receiving status messages from expand/collapse jobs"""
+        self.status_callback = callback
+    
+    def set_filter_cleared_callback(self, callback):
+        """Set the callback told when revealing a node had to leave filter mode"""
+        self.filter_cleared_callback = callback
+    
+    def _notify(self, message: str):
+        if self.status_callback:
+            self.status_callback(message)
+    
     def select_and_reveal_node(self, target_node: ASTNode):
         """Select and reveal a specific node in the tree view"""
         try:
-            # Find the tree item ID that corresponds to our target node
-            # Use the existing node_map which maps item_id -> node
-            # Compare by cursor properties since node objects might be different instances
-            target_item = None
-            for item_id, node in self.node_map.items():
-                try:
-                    # Compare basic properties
-                    if (node.cursor.kind == target_node.cursor.kind and 
-                        node.cursor.spelling == target_node.cursor.spelling):
-                        
-                        # Also compare location if available
-                        node_loc = node.cursor.location
-                        target_loc = target_node.cursor.location
-                        
-                        if (node_loc and target_loc and 
-                            node_loc.line == target_loc.line and
-                            node_loc.column == target_loc.column):
-                            target_item = item_id
-                            break
-                        elif not node_loc and not target_loc:
-                            # Both have no location, match by kind and spelling only
-                            target_item = item_id
-                            break
-                except Exception as e:
-                    # Skip nodes that have issues with property access
-                    continue
+            # Reverse map lookup; collapsed ancestor levels are inserted as needed
+            target_item = self._item_for_node(target_node)
             
             if target_item:
                 # Expand all parent items to make the node visible
@@ -197,20 +648,97 @@ class ASTInfoPanel:
         
         self.text.config(state='disabled')
         
+    def append_section(self, title: str, lines):
+        """Append a titled block of lines below the node details"""
+        self.text.config(state='normal')
+        self.text.insert(tk.END, f"\n{title}:\n", "bold")
+        for line in lines:
+            self.text.insert(tk.END, f"  {line}\n")
+        self.text.config(state='disabled')
+        
     def clear(self):
         """Clear the info panel"""
         self.text.config(state='normal')
         self.text.delete(1.0, tk.END)
         self.text.config(state='disabled')
 
+# Keywords for the regex highlighter (semantic highlighting refines this once a parse exists)
+CPP_KEYWORDS = [
+    'auto', 'break', 'case', 'char', 'const', 'continue', 'default', 'do',
+    'double', 'else', 'enum', 'extern', 'float', 'for', 'goto', 'if',
+    'int', 'long', 'register', 'return', 'short', 'signed', 'sizeof', 'static',
+    'struct', 'switch', 'typedef', 'union', 'unsigned', 'void', 'volatile', 'while',
+    'class', 'private', 'protected', 'public', 'friend', 'inline', 'operator',
+    'overload', 'template', 'this', 'virtual', 'bool', 'false', 'true',
+    'namespace', 'using', 'try', 'catch', 'throw', 'new', 'delete'
+]
+
+_SYNTAX_PATTERN = re.compile(r"""
+      (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+    | (?P<string>"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)
+    | (?P<number>\b(?:0[xX][0-9a-fA-F']+|\d[\d']*(?:\.\d*)?(?:[eE][+-]?\d+)?)[uUlLfF]*)
+    | (?P<keyword>\b(?:""" + "|".join(CPP_KEYWORDS) + r""")\b)
+""", re.DOTALL | re.VERBOSE)
+
+def tokenize_source(content: str) -> Dict[str, Tuple[List[int], List[Tuple[int, int, int]]]]:
+    """Scan source text into per-tag range lists (safe to run off the Tk thread)
+    
+    Returns {tag: (lines, spans)} where spans are (line, start_col, end_col)
+    with 1-based lines and 0-based columns, sorted by line; lines holds the
+    line of each span for bisecting. Multi-line comments are split per line.
+    """
+    line_starts = [0]
+    position = content.find('\n')
+    while position != -1:
+        line_starts.append(position + 1)
+        position = content.find('\n', position + 1)
+    
+    ranges = {tag: ([], []) for tag in _SYNTAX_PATTERN.groupindex}
+    line = 1
+    for match in _SYNTAX_PATTERN.finditer(content):
+        tag = match.lastgroup
+        start, end = match.span()
+        while line < len(line_starts) and line_starts[line] <= start:
+            line += 1
+        lines, spans = ranges[tag]
+        
+        # Emit one span per line the match covers
+        span_line = line
+        while True:
+            line_start = line_starts[span_line - 1]
+            line_end = line_starts[span_line] - 1 if span_line < len(line_starts) else len(content)
+            lines.append(span_line)
+            spans.append((span_line, start - line_start, min(end, line_end) - line_start))
+            if end <= line_end:
+                break
+            span_line += 1
+            start = line_starts[span_line - 1]
+    return ranges
+
 class SourceCodeViewer:
     """Panel for displaying source code with syntax highlighting and AST node highlighting"""
     
+    HIGHLIGHT_CHUNK = 200   # Lines tagged together when they scroll into view
+    HIGHLIGHT_MARGIN = 100  # Lines above/below the viewport painted ahead of time
+    EDIT_DEBOUNCE_MS = 300  # Idle time after the last keystroke before the buffer is reparsed
+    
     def __init__(self, parent):
         self.frame = ttk.Frame(parent)
         self.current_file = None
         self.file_lines = []
         
+        # Live edit mode: the buffer is handed to edit_callback after a pause in typing
+        self.editable = False
+        self.edit_callback = None
+        self._edit_after = None
+        self._last_edit_time = None
+        
+        # Syntax ranges from the background tokenizer and the chunks already tagged
+        self._syntax_ranges = None
+        self._syntax_generation = 0
+        self._painted_chunks = set()
+        self._paint_after = None
+        
         # Detect system theme colors
         self._setup_theme_colors()
         
@@ -230,19 +758,44 @@ class SourceCodeViewer:
             selectforeground=self.select_fg_color
         )
         
+        # Line numbers live in their own widget so text positions are plain source positions
+        self.gutter = tk.Text(
+            text_frame,
+            width=4,
+            wrap=tk.NONE,
+            state='disabled',
+            font=('Consolas', 10),
+            bg=self.bg_color,
+            fg=self.gutter_fg_color,
+            borderwidth=0,
+            highlightthickness=0,
+            padx=4,
+            takefocus=0,
+            cursor='arrow'
+        )
+        self.gutter.tag_configure("line_number", justify='right')
+        self.gutter.tag_configure("definition_marker", foreground=self.function_color,
+                                  font=('Consolas', 10, 'bold'))
+        self.gutter.tag_configure("declaration_marker", foreground=self.type_color)
+        
         # Create themed scrollbars
-        v_scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self.text.yview)
+        self.v_scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self._on_scrollbar)
         h_scrollbar = ttk.Scrollbar(text_frame, orient="horizontal", command=self.text.xview)
-        self.text.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.text.configure(yscrollcommand=self._on_text_yscroll, xscrollcommand=h_scrollbar.set)
         
         # Pack scrollbars and text widget using grid for better control
-        self.text.grid(row=0, column=0, sticky='nsew')
-        v_scrollbar.grid(row=0, column=1, sticky='ns')
-        h_scrollbar.grid(row=1, column=0, sticky='ew')
+        self.gutter.grid(row=0, column=0, sticky='ns')
+        self.text.grid(row=0, column=1, sticky='nsew')
+        self.v_scrollbar.grid(row=0, column=2, sticky='ns')
+        h_scrollbar.grid(row=1, column=1, sticky='ew')
         
         # Configure grid weights
         text_frame.grid_rowconfigure(0, weight=1)
-        text_frame.grid_columnconfigure(0, weight=1)
+        text_frame.grid_columnconfigure(1, weight=1)
+        
+        # Wheel scrolling over the gutter scrolls the source
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.gutter.bind(sequence, self._on_gutter_wheel)
         
         # Configure highlighting tags with theme-aware colors
         self._configure_syntax_tags()
@@ -260,6 +813,16 @@ class SourceCodeViewer:
         self.text.bind("<Motion>", self._on_mouse_motion)
         self.text.bind("<Leave>", self._on_mouse_leave)
         self.current_hover_line = None
+        self.text.bind("<<Modified>>", self._on_text_modified)
+        
+        # Motion events are coalesced into one update per idle cycle
+        self.hover_callback = None
+        self._pending_motion = None
+        self._motion_after = None
+        self._cursor_shape = None
+        self._tooltip = None
+        self._tooltip_label = None
+        self._tooltip_text = None
     
     def _setup_theme_colors(self):
         """Detect system theme and set appropriate colors"""
@@ -350,6 +913,11 @@ class SourceCodeViewer:
             self.comment_color = '#6A9955'  # Green for comments
             self.string_color = '#CE9178'   # Light orange for strings
             self.number_color = '#B5CEA8'   # Light green for numbers
+            self.type_color = '#4EC9B0'     # Teal for types and namespaces
+            self.function_color = '#DCDCAA' # Pale yellow for functions
+            self.member_color = '#9CDCFE'   # Light blue for members and parameters
+            self.macro_color = '#C586C0'    # Pink for macros and directives
+            self.gutter_fg_color = '#858585'  # Gray for line numbers
         else:
             # Light theme colors - use system colors as base
             self.bg_color = system_bg if system_bg != 'systemWindowBackgroundColor' else '#FFFFFF'
@@ -363,6 +931,11 @@ class SourceCodeViewer:
             self.comment_color = '#008000'  # Green for comments
             self.string_color = '#A31515'   # Dark red for strings
             self.number_color = '#FF6600'   # Orange for numbers
+            self.type_color = '#267F99'     # Teal for types and namespaces
+            self.function_color = '#795E26' # Brown for functions
+            self.member_color = '#001080'   # Navy for members and parameters
+            self.macro_color = '#AF00DB'    # Purple for macros and directives
+            self.gutter_fg_color = '#808080'  # Gray for line numbers
     
     def _configure_syntax_tags(self):
         """Configure syntax highlighting tags with theme-appropriate colors"""
@@ -382,6 +955,16 @@ class SourceCodeViewer:
                                foreground=self.string_color)
         self.text.tag_configure("number", 
                                foreground=self.number_color)
+        
+        # Semantic tags, only produced once a parse is available
+        self.text.tag_configure("type", foreground=self.type_color)
+        self.text.tag_configure("namespace", foreground=self.type_color)
+        self.text.tag_configure("function", foreground=self.function_color)
+        self.text.tag_configure("member", foreground=self.member_color)
+        self.text.tag_configure("parameter", foreground=self.member_color,
+                               font=('Consolas', 10, 'italic'))
+        self.text.tag_configure("macro", foreground=self.macro_color)
+        self.text.tag_configure("preprocessor", foreground=self.macro_color)
         self.text.tag_configure("hover_line", 
                                background=self.line_highlight_bg,
                                foreground=self.fg_color)
@@ -394,27 +977,119 @@ class SourceCodeViewer:
                 content = f.read()
                 self.file_lines = content.splitlines()
             
+            # One insert for the whole file; text positions are source line.column-1
             self.text.config(state='normal')
             self.text.delete(1.0, tk.END)
+            self.text.insert(1.0, "\n".join(self.file_lines) + "\n")
+            self.text.edit_modified(False)  # Loading is not an edit
+            self.text.edit_reset()  # Undo must not reach into the previous file
+            self._set_line_numbers(len(self.file_lines))
             
-            # Add line numbers and content
-            for i, line in enumerate(self.file_lines, 1):
-                line_text = f"{i:4d}: {line}\n"
-                self.text.insert(tk.END, line_text)
-            
-            # Apply basic syntax highlighting
+            # Syntax highlighting is tokenized in the background and painted per viewport
             self._apply_syntax_highlighting()
             
-            self.text.config(state='disabled')
+            self._lock_text()
             return True
             
         except Exception as e:
             self.text.config(state='normal')
             self.text.delete(1.0, tk.END)
             self.text.insert(tk.END, f"Error loading file '{filename}': {str(e)}")
-            self.text.config(state='disabled')
+            self.text.edit_modified(False)
+            self._lock_text()
+            self._set_line_numbers(0)
+            self._syntax_generation += 1  # Drop any pending highlight results
+            self._syntax_ranges = None
             return False
     
+    def _lock_text(self):
+        """Return the text widget to its resting state (read-only unless editing)"""
+        self.text.config(state='normal' if self.editable else 'disabled')
+    
+    def set_editable(self, editable: bool):
+        """Switch live edit mode on or off"""
+        self.editable = editable
+        self.text.config(undo=editable)
+        self._lock_text()
+        if not editable and self._edit_after is not None:
+            self.text.after_cancel(self._edit_after)
+            self._edit_after = None
+    
+    def set_edit_callback(self, callback):
+        """Set the callback receiving edit_callback(content, last_edit_time) after typing pauses"""
+        self.edit_callback = callback
+    
+    def get_content(self) -> str:
+        """Current buffer text (without Tk's trailing newline)"""
+        return self.text.get(1.0, "end-1c")
+    
+    def _on_text_modified(self, event):
+        """Restart the reparse debounce on every change to the buffer"""
+        # <<Modified>> is queued: the flag is already clear again for loads and for the reset below
+        if not self.text.edit_modified():
+            return
+        self.text.edit_modified(False)
+        if not self.editable:
+            return
+        self._last_edit_time = time.perf_counter()
+        if self._edit_after is not None:
+            self.text.after_cancel(self._edit_after)
+        self._edit_after = self.text.after(self.EDIT_DEBOUNCE_MS, self._flush_edit)
+    
+    def _flush_edit(self):
+        """Typing paused: refresh the line bookkeeping and hand the buffer on"""
+        self._edit_after = None
+        content = self.get_content()
+        lines = content.splitlines()
+        if len(lines) != len(self.file_lines):
+            self._set_line_numbers(len(lines))
+        self.file_lines = lines
+        if self.edit_callback:
+            self.edit_callback(content, self._last_edit_time)
+    
+    def _set_line_numbers(self, line_count: int):
+        """Fill the gutter with one number per source line (single insert)"""
+        self.gutter.config(state='normal', width=max(3, len(str(line_count))))
+        self.gutter.delete(1.0, tk.END)
+        if line_count:
+            numbers = "\n".join(str(i) for i in range(1, line_count + 1)) + "\n"
+            self.gutter.insert(1.0, numbers, "line_number")
+        self.gutter.config(state='disabled')
+        self.gutter.yview_moveto(self.text.yview()[0])
+    
+    def set_line_markers(self, markers: Dict[int, str]):
+        """Mark gutter lines: markers maps a line to 'definition' or 'declaration'"""
+        for kind in ('definition', 'declaration'):
+            tag = f"{kind}_marker"
+            self.gutter.tag_remove(tag, 1.0, tk.END)
+            indices = []
+            for line, marker in markers.items():
+                if marker == kind and 1 <= line <= len(self.file_lines):
+                    indices.append(f"{line}.0")
+                    indices.append(f"{line}.end")
+            if indices:
+                self.gutter.tag_add(tag, *indices)  # One Tk call per marker kind
+    
+    def _on_text_yscroll(self, first, last):
+        """Keep the scrollbar and the gutter in step with the source text"""
+        self.v_scrollbar.set(first, last)
+        self.gutter.yview_moveto(first)
+        self._schedule_paint()
+    
+    def _on_scrollbar(self, *args):
+        self.text.yview(*args)
+    
+    def _on_gutter_wheel(self, event):
+        """Forward wheel scrolling over the line numbers to the source text"""
+        if event.num == 4:
+            delta = -1
+        elif event.num == 5:
+            delta = 1
+        else:
+            delta = -1 if event.delta > 0 else 1
+        self.text.yview_scroll(delta * 3, "units")
+        return "break"
+    
     def highlight_location(self, line: int, column: int = None, end_line: int = None, end_column: int = None):
         """Highlight a specific location in the source code"""
         if not self.current_file or line < 1 or line > len(self.file_lines):
@@ -426,13 +1101,12 @@ class SourceCodeViewer:
         self.text.tag_remove("highlight", 1.0, tk.END)
         self.text.tag_remove("highlight_line", 1.0, tk.END)
         
-        # Calculate text widget position (accounting for line numbers)
-        # Line numbers are "nnnn: " format, so 6 characters
-        start_pos = f"{line}.{6 + (column - 1 if column else 0)}"
+        # Text widget columns are 0-based, libclang columns 1-based
+        start_pos = f"{line}.{column - 1 if column else 0}"
         
         if end_line and end_column:
             # Highlight specific range
-            end_pos = f"{end_line}.{6 + (end_column - 1)}"
+            end_pos = f"{end_line}.{end_column - 1}"
             self.text.tag_add("highlight", start_pos, end_pos)
         elif column:
             # Highlight from column to end of word/token
@@ -443,7 +1117,7 @@ class SourceCodeViewer:
                 end_col = column
                 while end_col <= len(line_content) and line_content[end_col - 1].isalnum():
                     end_col += 1
-                end_pos = f"{line}.{6 + (end_col - 1)}"
+                end_pos = f"{line}.{end_col - 1}"
                 self.text.tag_add("highlight", start_pos, end_pos)
             else:
                 # Just highlight the line
@@ -455,7 +1129,7 @@ class SourceCodeViewer:
         # Scroll to make the highlighted area visible
         self.text.see(start_pos)
         
-        self.text.config(state='disabled')
+        self._lock_text()
         self.current_highlight_line = line
     
     def clear_highlight(self):
@@ -463,63 +1137,86 @@ class SourceCodeViewer:
         self.text.config(state='normal')
         self.text.tag_remove("highlight", 1.0, tk.END)
         self.text.tag_remove("highlight_line", 1.0, tk.END)
-        self.text.config(state='disabled')
+        self._lock_text()
         self.current_highlight_line = None
     
     def _apply_syntax_highlighting(self):
-        """Apply basic C++ syntax highlighting"""
-        content = self.text.get(1.0, tk.END)
-        
-        # C++ keywords
-        keywords = [
-            'auto', 'break', 'case', 'char', 'const', 'continue', 'default', 'do',
-            'double', 'else', 'enum', 'extern', 'float', 'for', 'goto', 'if',
-            'int', 'long', 'register', 'return', 'short', 'signed', 'sizeof', 'static',
-            'struct', 'switch', 'typedef', 'union', 'unsigned', 'void', 'volatile', 'while',
-            'class', 'private', 'protected', 'public', 'friend', 'inline', 'operator',
-            'overload', 'template', 'this', 'virtual', 'bool', 'false', 'true',
-            'namespace', 'using', 'try', 'catch', 'throw', 'new', 'delete'
-        ]
-        
-        lines = content.split('\n')
-        for line_num, line in enumerate(lines, 1):
-            # Skip line number prefix when analyzing
-            if len(line) > 6 and line[4:6] == ': ':
-                code_part = line[6:]  # Skip "nnnn: " prefix
-                start_col = 6
-                
-                # Highlight keywords
-                words = code_part.split()
-                col = start_col
-                for word in words:
-                    word_start = line.find(word, col - start_col + start_col)
-                    if word_start != -1 and word.strip('(){}[];,') in keywords:
-                        start_pos = f"{line_num}.{word_start}"
-                        end_pos = f"{line_num}.{word_start + len(word)}"
-                        self.text.tag_add("keyword", start_pos, end_pos)
-                    col = word_start + len(word) if word_start != -1 else col
-                
-                # Highlight comments
-                if '//' in code_part:
-                    comment_start = code_part.find('//')
-                    start_pos = f"{line_num}.{start_col + comment_start}"
-                    end_pos = f"{line_num}.end"
-                    self.text.tag_add("comment", start_pos, end_pos)
-                
-                # Highlight strings (basic)
-                in_string = False
-                i = 0
-                while i < len(code_part):
-                    if code_part[i] == '"' and (i == 0 or code_part[i-1] != '\\'):
-                        if not in_string:
-                            string_start = i
-                            in_string = True
-                        else:
-                            start_pos = f"{line_num}.{start_col + string_start}"
-                            end_pos = f"{line_num}.{start_col + i + 1}"
-                            self.text.tag_add("string", start_pos, end_pos)
-                            in_string = False
-                    i += 1
+        """Tokenize the file on a worker thread, then paint the visible lines
+        
+        Tags are only added for the viewport plus a margin, in chunks of
+        HIGHLIGHT_CHUNK lines; scrolling paints further chunks as they appear.
+        """
+        self._syntax_generation += 1
+        generation = self._syntax_generation
+        self._syntax_ranges = None
+        self._painted_chunks = set()
+        content = "\n".join(self.file_lines)
+        result = {}
+        
+        def work():
+            result['ranges'] = tokenize_source(content)
+        
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        
+        def poll():
+            if generation != self._syntax_generation:
+                return  # A newer file replaced this one
+            if worker.is_alive():
+                self.text.after(20, poll)
+                return
+            self._syntax_ranges = result.get('ranges')
+            self._schedule_paint()
+        
+        self.text.after(20, poll)
+    
+    def set_highlight_ranges(self, ranges: Dict[str, Tuple[List[int], List[Tuple[int, int, int]]]]):
+        """Replace the regex highlighting with precomputed ranges (e.g. semantic ones from a parse)
+        
+        Ranges use the tokenize_source layout and are painted per viewport.
+        """
+        self._syntax_generation += 1  # Drop a regex tokenizer still running
+        for tag in set(ranges) | set(self._syntax_ranges or ()):
+            self.text.tag_remove(tag, 1.0, tk.END)
+        self._syntax_ranges = ranges
+        self._painted_chunks = set()
+        self._schedule_paint()
+    
+    def _schedule_paint(self):
+        """Paint newly visible lines once the event queue is idle (coalesces scroll bursts)"""
+        if self._paint_after is None and self._syntax_ranges:
+            self._paint_after = self.text.after_idle(self._paint_visible)
+    
+    def _visible_lines(self) -> Tuple[int, int]:
+        """First and last source line currently shown"""
+        first = int(self.text.index("@0,0").split('.')[0])
+        last = int(self.text.index(f"@0,{self.text.winfo_height()}").split('.')[0])
+        return first, last
+    
+    def _paint_visible(self):
+        """Add syntax tags for the unpainted chunks around the viewport"""
+        self._paint_after = None
+        if not self._syntax_ranges:
+            return
+        first, last = self._visible_lines()
+        first_chunk = max(0, first - 1 - self.HIGHLIGHT_MARGIN) // self.HIGHLIGHT_CHUNK
+        last_chunk = (last - 1 + self.HIGHLIGHT_MARGIN) // self.HIGHLIGHT_CHUNK
+        for chunk in range(first_chunk, last_chunk + 1):
+            if chunk in self._painted_chunks:
+                continue
+            self._painted_chunks.add(chunk)
+            start_line = chunk * self.HIGHLIGHT_CHUNK + 1
+            end_line = start_line + self.HIGHLIGHT_CHUNK
+            for tag, (lines, spans) in self._syntax_ranges.items():
+                i = bisect_left(lines, start_line)
+                j = bisect_left(lines, end_line)
+                if i == j:
+                    continue
+                indices = []
+                for line, start_col, end_col in spans[i:j]:
+                    indices.append(f"{line}.{start_col}")
+                    indices.append(f"{line}.{end_col}")
+                self.text.tag_add(tag, *indices)  # One Tk call per tag and chunk
     
     def set_click_callback(self, callback):
         """Set the callback function for source code clicks"""
@@ -535,62 +1232,177 @@ class SourceCodeViewer:
         line_num = int(click_pos.split('.')[0])
         col_num = int(click_pos.split('.')[1])
         
-        # Convert display line number to actual source line number
-        # (accounting for the "nnnn: " prefix)
+        # Text positions are source positions (0-based column)
         if line_num <= len(self.file_lines):
-            # Extract the actual column in source code (skip line number prefix)
-            display_line = self.text.get(f"{line_num}.0", f"{line_num}.end")
-            if len(display_line) > 6 and display_line[4:6] == ': ':
-                # User clicked after the line number prefix
-                if col_num > 6:
-                    source_col = col_num - 6  # Adjust for "nnnn: " prefix
-                    # Call the callback with 1-based line and column numbers
-                    self.click_callback(line_num, source_col)
+            # Call the callback with 1-based line and column numbers
+            self.click_callback(line_num, col_num + 1)
+    
+    def set_hover_callback(self, callback):
+        """Set the callback answering hover_callback(line, column) -> tooltip text or None"""
+        self.hover_callback = callback
     
     def _on_mouse_motion(self, event):
-        """Handle mouse motion for hover effects"""
+        """Record the pointer position; the hover update runs once per idle cycle"""
         if not self.current_file:
             return
-            
+        self._pending_motion = (event.x, event.y, event.x_root, event.y_root)
+        if self._motion_after is None:
+            self._motion_after = self.text.after_idle(self._process_motion)
+    
+    def _process_motion(self):
+        """Apply the latest pointer position: hover line, cursor shape and tooltip"""
+        self._motion_after = None
+        if self._pending_motion is None:
+            return
+        x, y, x_root, y_root = self._pending_motion
+        self._pending_motion = None
+        
         # Get the line under the mouse cursor
         try:
-            mouse_pos = self.text.index(f"@{event.x},{event.y}")
-            line_num = int(mouse_pos.split('.')[0])
-            
-            # Only highlight if this is a different line
-            if line_num != self.current_hover_line:
-                # Clear previous hover highlight
-                if self.current_hover_line:
-                    self.text.tag_remove("hover_line", f"{self.current_hover_line}.0", f"{self.current_hover_line}.end")
-                
-                # Add hover highlight to current line (if valid)
-                if 1 <= line_num <= len(self.file_lines):
-                    self.text.tag_add("hover_line", f"{line_num}.0", f"{line_num}.end")
-                    self.current_hover_line = line_num
-                    # Change cursor to indicate clickable area
-                    self.text.configure(cursor="hand2")
-                else:
-                    self.current_hover_line = None
-                    self.text.configure(cursor="xterm")
-        except:
-            # If there's any error, just use normal cursor
-            self.text.configure(cursor="xterm")
+            mouse_pos = self.text.index(f"@{x},{y}")
+            line_num, col_num = (int(part) for part in mouse_pos.split('.'))
+        except (tk.TclError, ValueError):
+            self._set_cursor("xterm")
+            return
+        
+        in_source = 1 <= line_num <= len(self.file_lines)
+        
+        # Only move the hover highlight if this is a different line
+        if line_num != self.current_hover_line:
+            if self.current_hover_line:
+                self.text.tag_remove("hover_line", f"{self.current_hover_line}.0", f"{self.current_hover_line}.end")
+            if in_source:
+                self.text.tag_add("hover_line", f"{line_num}.0", f"{line_num}.end")
+                self.current_hover_line = line_num
+            else:
+                self.current_hover_line = None
+        
+        # Change cursor to indicate clickable area
+        self._set_cursor("hand2" if in_source else "xterm")
+        
+        tip = None
+        if in_source and self.hover_callback:
+            tip = self.hover_callback(line_num, col_num + 1)
+        self._show_tooltip(tip, x_root, y_root)
+    
+    def _set_cursor(self, cursor: str):
+        """Reconfigure the widget cursor only when the shape actually changes"""
+        if cursor != self._cursor_shape:
+            self._cursor_shape = cursor
+            self.text.configure(cursor=cursor)
+    
+    def _show_tooltip(self, tip: Optional[str], x_root: int, y_root: int):
+        """Show, move or hide the hover tooltip"""
+        if not tip:
+            if self._tooltip is not None:
+                self._tooltip.withdraw()
+            self._tooltip_text = None
+            return
+        if self._tooltip is None:
+            self._tooltip = tk.Toplevel(self.text)
+            self._tooltip.wm_overrideredirect(True)
+            self._tooltip_label = tk.Label(self._tooltip, justify='left', relief='solid', borderwidth=1,
+                                           bg=self.line_highlight_bg, fg=self.fg_color,
+                                           font=('Consolas', 9), padx=4, pady=1)
+            self._tooltip_label.pack()
+        if tip != self._tooltip_text:
+            self._tooltip_text = tip
+            self._tooltip_label.configure(text=tip)
+        self._tooltip.wm_geometry(f"+{x_root + 14}+{y_root + 18}")
+        self._tooltip.deiconify()
     
     def _on_mouse_leave(self, event):
         """Handle mouse leaving the text widget"""
+        if self._motion_after is not None:
+            self.text.after_cancel(self._motion_after)
+            self._motion_after = None
+        self._pending_motion = None
+        
         # Clear hover highlight
         if self.current_hover_line:
             self.text.tag_remove("hover_line", f"{self.current_hover_line}.0", f"{self.current_hover_line}.end")
             self.current_hover_line = None
+        self._show_tooltip(None, 0, 0)
         # Reset cursor
-        self.text.configure(cursor="xterm")
+        self._set_cursor("xterm")
+
+class ConsoleInterrupt(BaseException):
+    """Raised inside a console command to stop it (BaseException so 'except Exception' can't swallow it)"""
+
+class ThreadOutputRouter:
+    """sys.stdout replacement that diverts writes made by capturing threads
+    
+    Each console command thread registers a list; its print() output is
+    appended there and streamed to the console by the Tk thread. Writes from
+    every other thread go to the original stream.
+    """
+    
+    def __init__(self, original):
+        self.original = original
+        self._targets = {}  # Thread ident -> list of written strings
+    
+    @classmethod
+    def install(cls) -> 'ThreadOutputRouter':
+        """Wrap sys.stdout once per process and return the router"""
+        if not isinstance(sys.stdout, cls):
+            sys.stdout = cls(sys.stdout)
+        return sys.stdout
+    
+    def capture(self, ident: int, target: list):
+        self._targets[ident] = target
+    
+    def release(self, ident: int):
+        self._targets.pop(ident, None)
+    
+    def write(self, text: str) -> int:
+        target = self._targets.get(threading.get_ident())
+        if target is None:
+            return self.original.write(text)
+        target.append(text)
+        return len(text)
+    
+    def flush(self):
+        if threading.get_ident() not in self._targets:
+            self.original.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self.original, name)
 
 class InteractiveConsole:
-    """Interactive Python console for AST exploration"""
+    """Interactive Python console for AST exploration
+    
+    Commands run on a worker thread so a slow query (or an endless loop)
+    never blocks Tk. They can be interrupted with Escape and are stopped
+    after command_timeout seconds; their output is streamed back by a poll
+    loop on the Tk thread.
+    """
+    
+    COMMAND_TIMEOUT = 30.0  # Seconds before a running command is interrupted
+    ABANDON_GRACE = 5.0     # Seconds an interrupted command gets to stop before it is abandoned
+    POLL_MS = 30            # Output/completion polling interval while a command runs
+    SCROLLBACK_LINES = 5000 # Oldest output lines are dropped beyond this
+    SCROLLBACK_CHARS = 250000  # ... and the oldest characters beyond this (one huge line)
+    RESULT_PREVIEW = 2000   # Characters of a result shown before the "expand" link
+    EXPANDABLE_KEPT = 20    # Collapsed results that can still be expanded
     
-    def __init__(self, parent, backend: ASTBackend):
+    def __init__(self, parent, backend: ASTBackend, command_timeout: float = COMMAND_TIMEOUT,
+                 scrollback_lines: int = SCROLLBACK_LINES):
         self.backend = backend
         self.selected_node = None
+        self.reveal_callback = None  # Selects a node in the tree view
+        
+        # Command execution state
+        self.command_timeout = command_timeout
+        self.stdout_router = ThreadOutputRouter.install()
+        self._running = None        # State dict of the command in flight
+        self._ui_calls = deque()    # (worker thread id, callable) queued for the Tk thread
+        
+        # Output state: writes are queued and flushed once per frame
+        self.scrollback_lines = max(100, scrollback_lines)
+        self._pending_output = []   # (text, tags) pairs not yet inserted
+        self._flush_after = None
+        self._expandable = {}       # Link tag -> full text of a collapsed result
+        self._expand_count = 0
         
         # Command history management
         self.command_history = []
@@ -624,6 +1436,11 @@ class InteractiveConsole:
         output_frame.grid_rowconfigure(0, weight=1)
         output_frame.grid_columnconfigure(0, weight=1)
         
+        self.output.tag_configure("expand_link", foreground="#2563EB", underline=True)
+        self.output.tag_bind("expand_link", "<Button-1>", self._on_expand_click)
+        self.output.tag_bind("expand_link", "<Enter>", lambda e: self.output.config(cursor="hand2"))
+        self.output.tag_bind("expand_link", "<Leave>", lambda e: self.output.config(cursor=""))
+        
         # Create entry widget for input
         input_frame = ttk.Frame(self.frame)
         input_frame.pack(fill='x', padx=2, pady=2)
@@ -637,6 +1454,7 @@ class InteractiveConsole:
         self.input_entry.bind('<Up>', self._history_up)
         self.input_entry.bind('<Down>', self._history_down)
         self.input_entry.bind('<KeyPress>', self._on_key_press)
+        self.input_entry.bind('<Escape>', self.interrupt)
         
         # Setup console environment
         self.console_globals = {
@@ -647,6 +1465,11 @@ class InteractiveConsole:
             'find_by_kind': self._find_by_kind,
             'find_vars': self._find_vars,
             'find_funcs': self._find_funcs,
+            'search_nodes': self.backend.search_nodes,
+            'goto_def': self._goto_def,
+            'find_refs': self._find_refs,
+            'analyze_deps': self._analyze_deps,
+            'def_use': self._def_use,
             'help_ast': self._help_ast,
             'reparse_file': self._reparse_file,
             'parse_with_args': self._parse_with_args,
@@ -663,9 +1486,15 @@ class InteractiveConsole:
         self._write_output("  find_by_kind(kind) - Find nodes by cursor kind\n")
         self._write_output("  find_vars() - Find all variable declarations\n")
         self._write_output("  find_funcs() - Find all function declarations\n")
+        self._write_output("  search_nodes(predicate) - Find nodes for which predicate(node) is true\n")
+        self._write_output("  goto_def(node) - Jump to the declaration a node refers to\n")
+        self._write_output("  find_refs(node) - Find all uses of a node's declaration\n")
+        self._write_output("  analyze_deps() - Data/compute/control dependency report\n")
+        self._write_output("  def_use(func) - Def/assign/read sites per variable of a function\n")
         self._write_output("  reparse_file(filename) - Reparse a file with default settings\n")
         self._write_output("  parse_with_args(filename, args) - Parse with custom arguments\n")
         self._write_output("  help_ast() - Show detailed help\n")
+        self._write_output("Press Escape to interrupt a running command.\n")
         self._write_output("Type help_ast() for more information.\n\n")
         
     def update_selected_node(self, node: ASTNode):
@@ -676,6 +1505,10 @@ class InteractiveConsole:
     def update_root_node(self, node: ASTNode):
         """Update the root node in console context"""
         self.console_globals['root'] = node
+    
+    def set_reveal_callback(self, callback):
+        """Set the callback used to select a node in the tree view"""
+        self.reveal_callback = callback
         
     def _execute_command(self, event):
         """Execute a Python command"""
@@ -697,42 +1530,258 @@ class InteractiveConsole:
         self.input_entry.delete(0, tk.END)
         self._write_output(f">>> {command}\n")
         
-        # Capture stdout
-        old_stdout = sys.stdout
-        sys.stdout = StringIO()
+        if self._running is not None:
+            self._write_output("Error: a command is still running (press Escape to interrupt it)\n\n")
+            return
         
+        # Compile once: expressions are evaluated (and their value shown), anything else is executed
         try:
-            # Execute the command
-            result = eval(command, self.console_globals)
-            output = sys.stdout.getvalue()
-            
-            if output:
-                self._write_output(output)
-            if result is not None:
-                self._write_output(f"{result}\n")
-                
-        except Exception as e:
-            # Try exec for statements
+            code_obj = compile(command, '<console>', 'eval')
+            is_expression = True
+        except SyntaxError:
             try:
-                sys.stdout = StringIO()
-                exec(command, self.console_globals)
-                output = sys.stdout.getvalue()
-                if output:
-                    self._write_output(output)
-            except Exception as e2:
-                self._write_output(f"Error: {str(e2)}\n")
-        finally:
-            sys.stdout = old_stdout
-            
-        self._write_output("\n")
+                code_obj = compile(command, '<console>', 'exec')
+                is_expression = False
+            except SyntaxError as e:
+                self._write_output(f"Error: {str(e)}\n\n")
+                return
+        
+        state = {
+            'output': [],                   # print() output not yet shown
+            'cancel': threading.Event(),
+            'deadline': time.monotonic() + self.command_timeout,
+            'done': False,
+            'result': None,                 # str() of an expression's value
+            'error': None,
+            'cancelled_at': None,           # When cancel was set (for abandoning a stuck command)
+        }
+        
+        def run():
+            ident = threading.get_ident()
+            self.stdout_router.capture(ident, state['output'])
+            sys.settrace(self._make_tracer(state['cancel']))
+            try:
+                if is_expression:
+                    result = eval(code_obj, self.console_globals)
+                    if result is not None:
+                        state['result'] = str(result)
+                else:
+                    exec(code_obj, self.console_globals)
+            except ConsoleInterrupt:
+                state['error'] = state.get('interrupt_reason', "Interrupted")
+            except Exception as e:
+                state['error'] = f"Error: {str(e)}"
+            finally:
+                sys.settrace(None)
+                self.stdout_router.release(ident)
+                state['done'] = True
+        
+        self._running = state
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        state['ident'] = worker.ident
+        self.output.after(self.POLL_MS, self._poll_command)
+    
+    @staticmethod
+    def _make_tracer(cancel: threading.Event):
+        """Trace function raising ConsoleInterrupt once cancel is set
+        
+        Every call is checked; code typed at the prompt is also checked per
+        opcode, so even a one-line loop ("while True: pass", which produces
+        no new line events) can be stopped.
+        """
+        def trace_console(frame, event, arg):
+            if cancel.is_set():
+                raise ConsoleInterrupt()
+            return trace_console
+        
+        def trace_calls(frame, event, arg):
+            if cancel.is_set():
+                raise ConsoleInterrupt()
+            if frame.f_code.co_filename == '<console>':
+                frame.f_trace_opcodes = True
+                return trace_console
+            return None
+        return trace_calls
+    
+    def _poll_command(self):
+        """Stream output of the running command and finish it (Tk thread)"""
+        state = self._running
+        if state is None:
+            return
+        self._flush_command_output(state)
+        self._run_ui_calls(state)
+        
+        if state['done']:
+            self._flush_command_output(state)
+            self._run_ui_calls(state)  # Queued between the drain above and the end of the command
+            if state['result'] is not None:
+                self._write_result(state['result'])
+            if state['error']:
+                self._write_output(f"{state['error']}\n")
+            self._write_output("\n")
+            self._running = None
+            return
+        
+        now = time.monotonic()
+        if now > state['deadline'] and not state['cancel'].is_set():
+            state['interrupt_reason'] = f"Interrupted: command timed out after {self.command_timeout:g} s"
+            state['cancelled_at'] = now
+            state['cancel'].set()
+        elif state['cancelled_at'] is not None and now - state['cancelled_at'] > self.ABANDON_GRACE:
+            # Blocked in native code (sleep, a long libclang call): the tracer never runs.
+            # Leave the thread behind and ignore whatever it still prints or queues.
+            self._flush_command_output(state)
+            self._write_output("Abandoned: the command did not stop (it is blocked outside Python) "
+                               "and keeps running in the background; its output is ignored\n\n")
+            self._running = None
+            return
+        self.output.after(self.POLL_MS, self._poll_command)
+    
+    def _run_ui_calls(self, state):
+        """Run the Tk calls queued by the command's thread (calls of abandoned commands are dropped)"""
+        while self._ui_calls:
+            ident, call = self._ui_calls.popleft()
+            if ident == state.get('ident'):
+                call()
+    
+    def _flush_command_output(self, state):
+        """Move everything the command printed so far into the console in one write"""
+        chunks = state['output']
+        if chunks:
+            count = len(chunks)
+            text = "".join(chunks[:count])
+            del chunks[:count]
+            self._write_output(text)
+    
+    def interrupt(self, event=None):
+        """Ask the running command to stop"""
+        state = self._running
+        if state is not None and not state['cancel'].is_set():
+            state['interrupt_reason'] = "Interrupted"
+            state['cancelled_at'] = time.monotonic()
+            state['cancel'].set()
+        return "break"
+    
+    def _call_in_ui(self, func, *args):
+        """Run a Tk-touching helper from a command thread on the Tk thread"""
+        if threading.current_thread() is threading.main_thread():
+            func(*args)
+        else:
+            self._ui_calls.append((threading.get_ident(), lambda: func(*args)))
+        
+    def _write_output(self, text: str, tags=()):
+        """Queue text for the console output (inserted on the next idle flush)"""
+        if not text:
+            return
+        self._pending_output.append((text, tags))
+        if self._flush_after is None:
+            self._flush_after = self.output.after_idle(self._flush_output)
+    
+    def _flush_output(self):
+        """Insert all queued output in one call and trim the scrollback"""
+        self._flush_after = None
+        pending = self._pending_output
+        if not pending:
+            return
+        self._pending_output = []
         
-    def _write_output(self, text: str):
-        """Write text to console output"""
+        # A single huge write only needs its last scrollback_lines lines (or characters)
+        total_lines = sum(text.count("\n") for text, tags in pending)
+        total_chars = sum(len(text) for text, tags in pending)
+        if total_lines > self.scrollback_lines or total_chars > self.SCROLLBACK_CHARS:
+            pending = self._tail_of(pending, self.scrollback_lines, self.SCROLLBACK_CHARS)
+        
+        args = []
+        for text, tags in pending:
+            args.extend((text, tags))
         self.output.config(state='normal')
-        self.output.insert(tk.END, text)
+        self.output.insert(tk.END, *args)
+        self._trim_scrollback()
         self.output.see(tk.END)
         self.output.config(state='disabled')
     
+    @staticmethod
+    def _tail_of(pending, line_count: int, char_count: int):
+        """The last line_count lines (at most char_count characters) of queued (text, tags)
+        pairs, with a note about the rest"""
+        kept = []
+        remaining = line_count
+        remaining_chars = char_count
+        for text, tags in reversed(pending):
+            lines = text.count("\n")
+            if lines >= remaining:
+                # Cut this piece after the newline that starts the kept tail
+                cut = len(text)
+                for _ in range(remaining + 1):
+                    cut = text.rfind("\n", 0, cut)
+                kept.append((text[cut + 1:][-remaining_chars:], tags))
+                break
+            if len(text) >= remaining_chars:
+                kept.append((text[-remaining_chars:], tags))
+                break
+            kept.append((text, tags))
+            remaining -= lines
+            remaining_chars -= len(text)
+        kept.append(("... (earlier output dropped, scrollback is limited)\n", ()))
+        kept.reverse()
+        return kept
+    
+    def _trim_scrollback(self):
+        """Delete the oldest lines beyond scrollback_lines and characters beyond SCROLLBACK_CHARS"""
+        line_count = int(self.output.index('end-1c').split('.')[0])
+        excess = line_count - self.scrollback_lines
+        trimmed = excess > 0
+        if trimmed:
+            self.output.delete('1.0', f'{excess + 1}.0')
+        char_count = self.output.count('1.0', 'end-1c', 'chars')
+        char_count = char_count[0] if isinstance(char_count, tuple) else (char_count or 0)
+        if char_count > self.SCROLLBACK_CHARS:
+            self.output.delete('1.0', f'1.0 + {char_count - self.SCROLLBACK_CHARS} chars')
+            trimmed = True
+        if trimmed:
+            # Forget collapsed results whose links were trimmed away
+            for tag in list(self._expandable):
+                if not self.output.tag_ranges(tag):
+                    del self._expandable[tag]
+    
+    def _write_result(self, text: str):
+        """Write a command result, collapsing long ones behind an "expand" link"""
+        if len(text) <= self.RESULT_PREVIEW:
+            self._write_output(f"{text}\n")
+            return
+        
+        self._expand_count += 1
+        tag = f"expand_{self._expand_count}"
+        self._expandable[tag] = text
+        while len(self._expandable) > self.EXPANDABLE_KEPT:
+            del self._expandable[next(iter(self._expandable))]
+        
+        hidden = len(text) - self.RESULT_PREVIEW
+        self._write_output(text[:self.RESULT_PREVIEW])
+        self._write_output(f" ... [expand: {hidden:,} more characters]", ("expand_link", tag))
+        self._write_output("\n")
+    
+    def _on_expand_click(self, event):
+        """Replace a clicked "expand" link with the rest of its result"""
+        index = self.output.index(f"@{event.x},{event.y}")
+        tag = next((name for name in self.output.tag_names(index) if name in self._expandable), None)
+        if tag is None:
+            return
+        
+        # Flushing may trim the scrollback, so the link's range is read afterwards
+        self._flush_output()
+        ranges = self.output.tag_ranges(tag)
+        text = self._expandable.pop(tag, None)
+        if text is None or not ranges:
+            return
+        start, end = ranges[:2]
+        self.output.config(state='normal')
+        self.output.delete(start, end)
+        self.output.insert(start, text[self.RESULT_PREVIEW:])
+        self._trim_scrollback()
+        self.output.config(state='disabled')
+    
     def _history_up(self, event):
         """Navigate up in command history (previous command)"""
         if not self.command_history:
@@ -777,16 +1826,11 @@ class InteractiveConsole:
             self.current_input = ""
         
     def _find_by_kind(self, kind_name: str):
-        """Find nodes by cursor kind name"""
-        if not self.backend.root_node:
-            return []
-            
-        # Convert string to cursor kind
+        """Find nodes by cursor kind name (a lazy NodeQuery)"""
         try:
-            kind = getattr(__import__('clang.cindex').cindex.CursorKind, kind_name)
-            return self.backend.get_nodes_by_kind(kind)
-        except AttributeError:
-            return f"Unknown cursor kind: {kind_name}"
+            return self.backend.query().of_kind(kind_name)
+        except ValueError as e:
+            return str(e)
             
     def _find_vars(self):
         """Find all variable declarations"""
@@ -796,10 +1840,49 @@ class InteractiveConsole:
         """Find all function declarations"""
         return self.backend.get_functions()
         
+    def _goto_def(self, node: ASTNode = None):
+        """Jump to the declaration referenced by a node (defaults to the selection)"""
+        node = node or self.selected_node
+        if node is None:
+            return "No node selected"
+        definition = self.backend.get_definition(node)
+        if definition is None:
+            return f"No definition found for {node.display_name}"
+        if self.reveal_callback:
+            self._call_in_ui(self.reveal_callback, definition)
+        return definition
+    
+    def _find_refs(self, node: ASTNode = None):
+        """Find all uses of the declaration behind a node (defaults to the selection)"""
+        node = node or self.selected_node
+        if node is None:
+            return "No node selected"
+        return self.backend.get_references(node)
+        
+    def _analyze_deps(self):
+        """Run the dependency analyzer over the current parse"""
+        from ast_analysis import analyze_dependencies
+        if not self.backend.root_node:
+            return "No file parsed"
+        return analyze_dependencies(self.backend)
+        
+    def _def_use(self, node: ASTNode = None):
+        """Def-use rows for a function node (defaults to the selection)"""
+        from ast_analysis import function_def_use
+        node = node or self.selected_node
+        if node is None:
+            return "No node selected"
+        table = function_def_use(self.backend, node)
+        if table is None:
+            return f"Not a main-file function: {node.display_name}"
+        return table.rows(self.backend)
+        
     def _reparse_file(self, filename: str):
         """Reparse a file with default settings"""
         try:
-            self.backend.parse_file(filename)
+            # Parse off to the side; the swap happens on the Tk thread
+            staged = self.backend.prepare_parse(filename)
+            self._call_in_ui(self.backend.commit_parse, staged)
             return f"Successfully reparsed: {filename}"
         except Exception as e:
             return f"Failed to reparse {filename}: {str(e)}"
@@ -807,7 +1890,8 @@ class InteractiveConsole:
     def _parse_with_args(self, filename: str, args: list):
         """Parse a file with custom arguments"""
         try:
-            self.backend.parse_file(filename, args)
+            staged = self.backend.prepare_parse(filename, args)
+            self._call_in_ui(self.backend.commit_parse, staged)
             return f"Successfully parsed {filename} with args: {args}"
         except Exception as e:
             return f"Failed to parse {filename} with args {args}: {str(e)}"
@@ -819,7 +1903,8 @@ AST Explorer Console Help:
 
 Console Features:
   ↑/↓ arrows - Navigate command history (up to 100 commands)
-  Enter - Execute command
+  Enter - Execute command (runs in the background; output streams in)
+  Escape - Interrupt a running command (commands also stop after a timeout)
   Tab completion - Available in Python expressions
 
 Objects:
@@ -847,13 +1932,30 @@ Functions:
   find_by_kind('KIND_NAME') - Find nodes by kind (e.g., 'VAR_DECL')
   find_vars() - Find all variable declarations
   find_funcs() - Find all function declarations
+  search_nodes(lambda n: ...) - Find nodes matching a predicate
+  goto_def(node=None) - Select the declaration a node refers to
+  find_refs(node=None) - List all uses of a node's declaration
+  analyze_deps() - Dependency report (.data_deps, .compute_deps, .control_deps, .what_when)
+  def_use(func=None) - Per-variable definitions/assignments/reads of a function
   reparse_file('filename') - Reparse a file with default settings
   parse_with_args('filename', ['-std=c++17', '-w']) - Parse with custom args
 
+Query Results (find_by_kind, find_vars, find_funcs, search_nodes):
+  Lazy: nothing is collected until used, and only what is needed.
+  Printing one shows the count and the first 20 nodes.
+  len(q) / q.count() - Number of nodes (counted, no list is built)
+  q.first(), q[5], q[10:20] - Single nodes or a slice (a list)
+  q.page(2) - Second page of 20 nodes
+  q.of_kind('CALL_EXPR'), q.named('size'), q.in_file('main.cpp'),
+  q.filter(lambda n: ...) - Narrow a query (chainable, still lazy)
+  q.to_list() - All nodes as a list
+
 Examples:
   selected.cursor.spelling  # Get name of selected node
   len(find_vars())          # Count variable declarations
+  find_by_kind('CALL_EXPR').named('push_back').count()  # Count push_back calls
   [n.cursor.spelling for n in find_vars()]  # List variable names
+  [n.location_str for n in find_refs()]     # Where is the selected variable used?
   selected.get_detailed_info()  # Get all info about selected node
   
   # Try different parsing options:
@@ -861,7 +1963,157 @@ Examples:
   parse_with_args('file.cpp', ['-std=c++20', '-w'])
   parse_with_args('file.cpp', ['-std=c++17', '-I/usr/include'])
 """
-        return help_text
+        print(help_text)  # Printed rather than returned, so it isn't collapsed like a long result
+
+class SymbolPalette:
+    """Ctrl+P style "go to symbol" popup over the current parse's symbol table"""
+    
+    RESULT_LIMIT = 50
+    
+    def __init__(self, root: tk.Tk, backend: ASTBackend, on_choose):
+        self.root = root
+        self.backend = backend
+        self.on_choose = on_choose  # on_choose(Symbol)
+        self.window = None
+        self.results = []
+        self._refresh_after = None
+    
+    def show(self):
+        """Open the palette (or focus it if it is already open)"""
+        from ast_index import get_symbol_table
+        if not self.backend.root_node:
+            return
+        self.table = get_symbol_table(self.backend)
+        if self.window is None:
+            self._create_window()
+        self.query_var.set("")
+        self._refresh()
+        self.window.deiconify()
+        self.window.lift()
+        self.entry.focus_set()
+    
+    def _create_window(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Go to Symbol")
+        self.window.transient(self.root)
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+        
+        # Centered near the top of the main window
+        self.root.update_idletasks()
+        width = 560
+        x = self.root.winfo_rootx() + max(0, (self.root.winfo_width() - width) // 2)
+        y = self.root.winfo_rooty() + 60
+        self.window.geometry(f"{width}x360+{x}+{y}")
+        
+        self.query_var = tk.StringVar()
+        self.entry = ttk.Entry(self.window, textvariable=self.query_var)
+        self.entry.pack(fill='x', padx=6, pady=6)
+        
+        list_frame = ttk.Frame(self.window)
+        list_frame.pack(fill='both', expand=True, padx=6, pady=(0, 6))
+        self.listbox = tk.Listbox(list_frame, font=('Consolas', 10), activestyle='none')
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=scrollbar.set)
+        self.listbox.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        
+        self.query_var.trace_add('write', self._on_query_changed)
+        self.entry.bind('<Down>', lambda e: self._move(1))
+        self.entry.bind('<Up>', lambda e: self._move(-1))
+        self.entry.bind('<Return>', lambda e: self._choose())
+        self.window.bind('<Escape>', lambda e: self.hide())
+        self.listbox.bind('<Double-Button-1>', lambda e: self._choose())
+        self.listbox.bind('<Return>', lambda e: self._choose())
+    
+    def hide(self):
+        if self.window is not None:
+            self.window.withdraw()
+    
+    def _on_query_changed(self, *args):
+        """Re-rank once per idle cycle however fast the user types"""
+        if self._refresh_after is None:
+            self._refresh_after = self.root.after_idle(self._refresh)
+    
+    def _refresh(self):
+        self._refresh_after = None
+        self.results = self.table.search(self.query_var.get(), self.RESULT_LIMIT)
+        self.listbox.delete(0, tk.END)
+        if self.results:
+            self.listbox.insert(tk.END, *(f"{symbol.name:32} {symbol.kind:9} "
+                                          f"{os.path.basename(symbol.path)}:{symbol.line}"
+                                          for symbol in self.results))
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+    
+    def _move(self, step: int):
+        if not self.results:
+            return "break"
+        selection = self.listbox.curselection()
+        index = (selection[0] if selection else 0) + step
+        index = max(0, min(len(self.results) - 1, index))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.activate(index)
+        self.listbox.see(index)
+        return "break"
+    
+    def _choose(self):
+        selection = self.listbox.curselection()
+        if not selection or not self.results:
+            return
+        symbol = self.results[selection[0]]
+        self.hide()
+        self.on_choose(symbol)
+
+class ReloadLatencyStats:
+    """Rolling record of the per-stage latency of automatic reloads"""
+    
+    STAGES = ('detect', 'parse', 'build', 'diff', 'render')
+    BUCKETS_MS = (50, 100, 200, 500, 1000, 2000)  # Upper bounds of the histogram buckets
+    
+    def __init__(self, size: int = 100):
+        self.samples = deque(maxlen=size)  # Dicts of stage -> seconds, oldest first
+    
+    def add(self, sample: Dict[str, float]):
+        self.samples.append(sample)
+    
+    def __len__(self):
+        return len(self.samples)
+    
+    @staticmethod
+    def _percentile(values: List[float], fraction: float) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    
+    def report(self) -> str:
+        """Text table of stage percentiles plus a histogram of the totals"""
+        if not self.samples:
+            return "No automatic reloads recorded yet."
+        lines = [f"Last {len(self.samples)} automatic reload(s), milliseconds",
+                 "",
+                 f"{'stage':<8}{'last':>8}{'p50':>8}{'p90':>8}{'max':>8}"]
+        totals = [sum(sample.values()) for sample in self.samples]
+        for stage in self.STAGES + ('total',):
+            if stage == 'total':
+                values = totals
+            else:
+                values = [sample.get(stage, 0.0) for sample in self.samples]
+            values = [value * 1000 for value in values]
+            lines.append(f"{stage:<8}{values[-1]:>8.0f}{self._percentile(values, 0.5):>8.0f}"
+                         f"{self._percentile(values, 0.9):>8.0f}{max(values):>8.0f}")
+        
+        lines.extend(["", "Total latency histogram"])
+        counts = [0] * (len(self.BUCKETS_MS) + 1)
+        for total in totals:
+            counts[bisect_left(self.BUCKETS_MS, total * 1000)] += 1
+        lower = 0
+        widest = max(counts)
+        for bound, count in zip(self.BUCKETS_MS + (None,), counts):
+            label = f"{lower}-{bound}" if bound is not None else f">{lower}"
+            bar = "#" * (round(30 * count / widest) if count else 0)
+            lines.append(f"{label:>10} ms {count:>4} {bar}".rstrip())
+            lower = bound
+        return "\n".join(lines)
 
 class ASTExplorerUI:
     """Main UI class that coordinates all components"""
@@ -873,11 +2125,26 @@ class ASTExplorerUI:
         
         # File monitoring attributes
         self.current_file_path = None
-        self.last_modified_time = None
-        self.file_check_interval = 1000  # Check every 1 second
+        self.file_watcher = None     # Created when monitoring first starts
+        self.changed_files = set()   # Watched files changed since the last reload
         self.monitoring_active = False
         self.dialog_showing = False  # Prevent multiple dialogs
-        self.last_dialog_time = 0    # Track when last dialog was shown
+        
+        # Auto-reload: changes are parsed in the background and swapped in without asking
+        user_config = clang_config.load_user_config()
+        self.auto_reload = bool(user_config.get('auto_reload', False))
+        self.reload_stats = ReloadLatencyStats()
+        self._reload_running = False
+        self._reload_pending = None  # Detection time of changes that arrived during a reload
+        
+        # Background parsing - only the newest request is shown
+        self._load_token = 0
+        
+        # Live edit mode: one buffer parse in flight, the newest buffer waits behind it
+        self.edit_mode = False
+        self._edit_parsing = False
+        self._edit_pending = None  # (content, last edit time, load token) typed during a parse
+        self._edit_dirty = False   # The shown parse is of an unsaved buffer
         
         # Create main horizontal paned window
         self.main_horizontal_paned = ttk.PanedWindow(root, orient='horizontal')
@@ -890,14 +2157,35 @@ class ASTExplorerUI:
         
         # Set up reverse navigation callback (source code -> AST)
         self.source_viewer.set_click_callback(self._on_source_click)
+        self.source_viewer.set_hover_callback(self._on_source_hover)
+        self.source_viewer.set_edit_callback(self._on_source_edited)
         
         # Create vertical paned window for the three main panels
         self.ast_panels_paned = ttk.PanedWindow(self.main_horizontal_paned, orient='vertical')
         
         # Top frame (50% - AST Tree View)
         tree_frame = ttk.LabelFrame(self.ast_panels_paned, text="AST Structure", padding=5)
-        self.ast_tree = ASTTreeView(tree_frame, backend, self._on_node_select)
+        
+        # Filter box above the tree, answered from the per-parse search index
+        filter_frame = ttk.Frame(tree_frame)
+        filter_frame.pack(fill='x', pady=(0, 4))
+        ttk.Label(filter_frame, text="Filter:").pack(side='left')
+        self.filter_var = tk.StringVar()
+        self.filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_var)
+        self.filter_entry.pack(side='left', fill='x', expand=True, padx=(4, 0))
+        self.filter_entry.bind('<Escape>', lambda e: self.filter_var.set(""))
+        self.filter_var.trace_add('write', self._on_filter_changed)
+        self._filter_after = None
+        
+        self.symbol_palette = SymbolPalette(self.root, backend, self._go_to_symbol)
+        
+        expand_budget = clang_config.load_user_config().get('expand_budget', ASTTreeView.EXPAND_BUDGET)
+        self.ast_tree = ASTTreeView(tree_frame, backend, self._on_node_select, expand_budget=expand_budget)
         self.ast_tree.frame.pack(fill='both', expand=True)
+        self.ast_tree.set_reference_callbacks(self.goto_definition, self.find_references)
+        self.ast_tree.set_progress_callback(self._on_tree_progress)
+        self.ast_tree.set_status_callback(self.update_status)
+        self.ast_tree.set_filter_cleared_callback(lambda: self.filter_var.set(""))
         
         # Middle frame (25% - Node Information)
         info_frame = ttk.LabelFrame(self.ast_panels_paned, text="Node Information", padding=5)
@@ -906,8 +2194,13 @@ class ASTExplorerUI:
         
         # Bottom frame (25% - Interactive Console)
         console_frame = ttk.LabelFrame(self.ast_panels_paned, text="Interactive Console", padding=5)
-        self.console = InteractiveConsole(console_frame, backend)
+        user_config = clang_config.load_user_config()
+        self.console = InteractiveConsole(
+            console_frame, backend,
+            command_timeout=user_config.get('console_timeout', InteractiveConsole.COMMAND_TIMEOUT),
+            scrollback_lines=user_config.get('console_scrollback', InteractiveConsole.SCROLLBACK_LINES))
         self.console.frame.pack(fill='both', expand=True)
+        self.console.set_reveal_callback(self.ast_tree.select_and_reveal_node)
         
         # Add frames to vertical paned window
         self.ast_panels_paned.add(tree_frame, weight=2)  # 50%
@@ -921,10 +2214,13 @@ class ASTExplorerUI:
         # Status bar
         self.status_bar = ttk.Label(root, text="Ready", relief='sunken', anchor='w')
         self.status_bar.pack(fill='x', side='bottom')
+        self._status_message = "Ready"  # Restored after transient progress readouts
         
     def _on_node_select(self, node: ASTNode):
         """Handle node selection from tree view"""
         self.info_panel.update_info(node)
+        self._show_def_use(node)
+        self._show_line_nodes(node)
         self.console.update_selected_node(node)
         
         # Highlight corresponding source code location
@@ -933,14 +2229,17 @@ class ASTExplorerUI:
     def _on_source_click(self, line: int, column: int):
         """Handle clicks on source code for reverse navigation"""
         try:
-            # Find the most specific AST node at the clicked location
-            node = self.backend.find_node_at_location(line, column)
+            # Find the most specific main-file node at the clicked location. Blank and
+            # comment lines have none: nothing is selected rather than some header node
+            node = self.backend.get_line_map().innermost(line, column)
             
             if node:
                 # Select and reveal the node in the tree view
                 self.ast_tree.select_and_reveal_node(node)
                 # Update info panel and console
                 self.info_panel.update_info(node)
+                self._show_def_use(node)
+                self._show_line_nodes(node, line)
                 self.console.update_selected_node(node)
                 
                 # Update status bar to show what was found
@@ -953,18 +2252,299 @@ class ASTExplorerUI:
             # Handle any errors gracefully
             self.status_bar.config(text=f"Error finding AST node: {str(e)}")
         
+    def _on_source_hover(self, line: int, column: int) -> Optional[str]:
+        """Tooltip text for the source position under the mouse: the innermost node there"""
+        if not self.backend.translation_unit:
+            return None
+        try:
+            node = self.backend.get_line_map().innermost(line, column)
+            if node is None:
+                return None
+            spelling = node.cursor.spelling
+            return f"{node.cursor.kind.name}: {spelling}" if spelling else node.cursor.kind.name
+        except Exception:
+            return None
+        
+    LINE_NODES_LIMIT = 40  # Entries listed under "Nodes on line N"
+    
+    def _show_line_nodes(self, node: ASTNode, line: Optional[int] = None):
+        """Add the nodes starting on or spanning a line (default: the node's first line) to the info panel"""
+        if not self.backend.owns_node(node):
+            return  # Shared header nodes are not in this parse's line map
+        try:
+            line_map = self.backend.get_line_map()
+            if line is None:
+                extent = line_map.extents.get(node.node_id)
+                if extent is None:
+                    return
+                line = extent[0]
+            entries = []
+            for node_id in line_map.ids_on_line(line)[:self.LINE_NODES_LIMIT]:
+                start_line, _, end_line, _ = line_map.extents[node_id]
+                entry = self.backend.nodes[node_id].display_name
+                if start_line != line or end_line != line:
+                    entry += f"  (lines {start_line}-{end_line})"
+                entries.append(entry)
+        except Exception:
+            return
+        if not entries:
+            return
+        hidden = len(line_map.ids_on_line(line)) - len(entries)
+        if hidden > 0:
+            entries.append(f"... {hidden} more")
+        self.info_panel.append_section(f"Nodes on line {line}", entries)
+    
+    def _show_def_use(self, node: ASTNode):
+        """Add the def-use chains of a selected function to the info panel"""
+        from ast_analysis import function_def_use
+        try:
+            table = function_def_use(self.backend, node)
+        except Exception:
+            return
+        if table is None:
+            return
+        
+        def lines_of(nodes):
+            return ", ".join(str(n.cursor.location.line) for n in nodes) or "-"
+        
+        lines = []
+        for row in table.rows(self.backend):
+            lines.append(f"{row['variable'].cursor.spelling}: def {lines_of(row['definitions'])} | "
+                         f"assign {lines_of(row['assignments'])} | read {lines_of(row['reads'])}")
+        self.info_panel.append_section("Def-Use (lines)", lines or ["<no variables>"])
+    
+    def goto_definition(self, node: ASTNode):
+        """Select the declaration/definition that a node refers to"""
+        definition = self.backend.get_definition(node)
+        if definition is None:
+            self.update_status(f"No definition found for {node.display_name}")
+            return
+        self.ast_tree.select_and_reveal_node(definition)
+        self.update_status(f"Definition: {definition.display_name} at {definition.location_str}")
+    
+    def find_references(self, node: ASTNode):
+        """List all uses of a node's declaration in the console"""
+        references = self.backend.get_references(node)
+        self.console._write_output(f"References to {node.display_name} ({len(references)}):\n")
+        for ref in references:
+            self.console._write_output(f"  {ref.location_str}  {ref.display_name}\n")
+        self.console._write_output("\n")
+        self.update_status(f"Found {len(references)} references")
+        
+    def load_file_async(self, filename: str, args: list = None, on_done=None):
+        """Parse a file on a worker thread, then swap it in and show it on the UI thread
+        
+        on_done(error) is called afterwards with None on success. A newer call
+        supersedes any parse still in flight.
+        """
+        self._load_token += 1
+        token = self._load_token
+        result = {}
+        
+        def work():
+            try:
+                result['staged'] = staged = self.backend.prepare_parse(filename, args)
+            except Exception as e:
+                result['error'] = e
+                return
+            try:
+                # Warm the per-parse highlight and hover caches here rather than on the UI thread
+                from ast_index import get_search_index, get_symbol_table
+                self._warm_display_caches(staged)
+                get_search_index(staged)
+                get_symbol_table(staged)
+            except Exception:
+                pass  # Retried (and reported) when the source is shown
+        
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        self.update_status(f"Parsing {os.path.basename(filename)}...")
+        
+        def poll():
+            if worker.is_alive():
+                self.root.after(20, poll)
+                return
+            if token != self._load_token:
+                return  # Superseded by a newer load
+            error = result.get('error')
+            if error is None:
+                self.backend.commit_parse(result['staged'])
+                self.populate_ast_tree()
+                self.update_status(f"Loaded: {filename}")
+            if on_done:
+                on_done(error)
+        
+        self.root.after(20, poll)
+        
+    @staticmethod
+    def _warm_display_caches(staged: ASTBackend):
+        """Compute what showing a parse needs (call on the worker thread)"""
+        from ast_analysis import semantic_highlight_ranges, line_markers
+        semantic_highlight_ranges(staged)
+        line_markers(staged)  # Also builds the line map used for hover and clicks
+    
+    def set_edit_mode(self, enabled: bool):
+        """Turn live editing of the source panel on or off
+        
+        While editing, file monitoring is paused and the buffer is reparsed
+        from memory after each pause in typing. Leaving edit mode discards
+        unsaved edits by reloading the file from disk.
+        """
+        if enabled == self.edit_mode:
+            return
+        if enabled and not self.backend.current_file:
+            messagebox.showinfo("No File", "Load a file before editing it.")
+            return
+        self.edit_mode = enabled
+        self._load_token += 1  # A buffer parse still running belongs to the previous session
+        self.source_viewer.set_editable(enabled)
+        if enabled:
+            self.stop_file_monitoring()
+            self.update_status("Live edit mode: the tree follows the buffer (nothing is saved)")
+        else:
+            self._edit_pending = None
+            if self._edit_dirty:
+                self._edit_dirty = False
+                self.current_file_path = os.path.abspath(self.backend.current_file)
+                self._reload_current_file()
+            else:
+                self.start_file_monitoring(self.backend.current_file)
+    
+    def _on_source_edited(self, content: str, edited_at: float):
+        """Typing paused: parse the buffer in the background (one parse at a time)"""
+        if not self.edit_mode or not self.backend.current_file:
+            return
+        if self._edit_parsing:
+            self._edit_pending = (content, edited_at, self._load_token)
+            return
+        self._edit_parsing = True
+        filename = self.backend.current_file
+        args = self.backend.current_args
+        token = self._load_token  # A load (or edit mode toggle) meanwhile makes this parse stale
+        result = {}
+        
+        def work():
+            start = time.perf_counter()
+            try:
+                result['staged'] = staged = self.backend.prepare_parse(filename, args, contents=content)
+                self._warm_display_caches(staged)
+            except Exception as e:
+                result['error'] = e
+            result['parse_time'] = time.perf_counter() - start
+        
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        
+        def poll():
+            if worker.is_alive():
+                self.root.after(20, poll)
+                return
+            self._edit_parsing = False
+            if token != self._load_token or self.backend.current_file != filename:
+                pass  # Stale: the buffer belonged to a load that has been replaced
+            elif self.edit_mode and 'staged' in result:
+                self._show_edited_parse(result['staged'], edited_at, result['parse_time'])
+            elif 'error' in result:
+                self.update_status(f"Parse of the buffer failed: {result['error']}")
+            pending, self._edit_pending = self._edit_pending, None
+            # Edits queued before a newer load are dropped with the stale parse
+            if pending is not None and pending[2] == self._load_token:
+                self._on_source_edited(pending[0], pending[1])
+        
+        self.root.after(20, poll)
+    
+    def _show_edited_parse(self, staged: ASTBackend, edited_at: float, parse_time: float):
+        """Swap in a buffer parse, patch the tree in place and report the latency"""
+        self.backend.commit_parse(staged)
+        self._edit_dirty = True
+        
+        start = time.perf_counter()
+        patched = self.ast_tree.patch()
+        self._apply_semantic_highlighting()
+        self.console.update_root_node(self.backend.root_node)
+        selection = self.ast_tree.tree.selection()
+        selected = self.ast_tree.node_map.get(selection[0]) if selection else None
+        if selected is not None:
+            self.console.update_selected_node(selected)
+        if self.filter_var.get().strip():
+            self._apply_filter()
+        update_time = time.perf_counter() - start
+        
+        total_ms = (time.perf_counter() - edited_at) * 1000
+        if patched is None:
+            changes = "tree rebuilt"
+        else:
+            kept, inserted, deleted = patched
+            changes = f"{inserted} inserted, {deleted} removed, {kept} kept"
+        self.update_status(f"Edit -> AST {total_ms:.0f} ms (parse {parse_time * 1000:.0f} ms, "
+                           f"tree {update_time * 1000:.0f} ms; {changes})")
+    
+    def _apply_semantic_highlighting(self):
+        """Color the source and mark declaration lines from the parse (cached per parse)"""
+        from ast_analysis import semantic_highlight_ranges, line_markers
+        if not self.backend.translation_unit:
+            return
+        try:
+            self.source_viewer.set_highlight_ranges(semantic_highlight_ranges(self.backend))
+            self.source_viewer.set_line_markers(line_markers(self.backend))
+        except Exception as e:
+            print(f"Semantic highlighting failed, keeping syntax colors: {e}")
+    
+    FILTER_RESULT_LIMIT = 200  # Matches shown in the tree while filtering
+    
+    def _on_filter_changed(self, *args):
+        """Re-filter once per idle cycle however fast the user types"""
+        if self._filter_after is None:
+            self._filter_after = self.root.after_idle(self._apply_filter)
+    
+    def _apply_filter(self):
+        """Show the index matches for the filter text (or the full tree when it is empty)"""
+        from ast_index import get_search_index
+        self._filter_after = None
+        query = self.filter_var.get().strip()
+        if not query:
+            self.ast_tree.clear_filter()
+            return
+        if not self.backend.root_node:
+            return
+        
+        start = time.perf_counter()
+        matches, total = get_search_index(self.backend).search_with_total(query, self.FILTER_RESULT_LIMIT)
+        search_ms = (time.perf_counter() - start) * 1000
+        self.ast_tree.show_matches(matches)
+        shown = f" (showing {len(matches)})" if total > len(matches) else ""
+        self.update_status(f"Filter '{query}': {total} matches{shown} in {search_ms:.1f} ms")
+    
+    def show_symbol_palette(self):
+        """Open the go-to-symbol palette"""
+        self.symbol_palette.show()
+    
+    def _go_to_symbol(self, symbol):
+        """Reveal a palette symbol in the tree and source"""
+        if symbol.node is not None:
+            self.ast_tree.select_and_reveal_node(symbol.node)
+            self._highlight_source_location(symbol.node)
+        elif os.path.abspath(symbol.path) == os.path.abspath(self.backend.current_file or ""):
+            self.source_viewer.highlight_location(symbol.line, symbol.column)  # Macros have no node
+        self.update_status(f"{symbol.kind} {symbol.name} at {os.path.basename(symbol.path)}:{symbol.line}")
+    
     def populate_ast_tree(self):
         """Populate the AST tree view"""
+        self._load_token += 1  # Background parses started before this parse are stale
+        self.filter_var.set("")  # A new parse starts unfiltered
         self.ast_tree.populate()
         if self.backend.root_node:
             self.console.update_root_node(self.backend.root_node)
             
         # Load source file in viewer
         if self.backend.current_file:
-            self.source_viewer.load_file(self.backend.current_file)
+            if self.source_viewer.load_file(self.backend.current_file):
+                self._apply_semantic_highlighting()
+            self._edit_dirty = False
             
-            # Start monitoring the file for changes
-            self.start_file_monitoring(self.backend.current_file)
+            # Start monitoring the file for changes (edits in memory take over while editing)
+            if not self.edit_mode:
+                self.start_file_monitoring(self.backend.current_file)
     
     def _highlight_source_location(self, node: ASTNode):
         """Highlight the source location of the selected AST node using its full extent"""
@@ -1023,8 +2603,19 @@ class ASTExplorerUI:
             self.main_horizontal_paned.add(self.source_frame, weight=1)
             
     def expand_all(self):
-        """Expand all tree items"""
+        """Expand all tree items (up to the expand budget)"""
         self.ast_tree.expand_all()
+    
+    def expand_to_level(self):
+        """Ask for a depth and expand the tree down to it"""
+        level = simpledialog.askinteger("Expand to Level", "Expand down to level:",
+                                        parent=self.root, initialvalue=3, minvalue=0)
+        if level is not None:
+            self.ast_tree.expand_to_level(level)
+    
+    def expand_subtree(self):
+        """Expand everything below the selected tree item"""
+        self.ast_tree.expand_subtree()
         
     def collapse_all(self):
         """Collapse all tree items"""
@@ -1032,76 +2623,197 @@ class ASTExplorerUI:
         
     def update_status(self, message: str):
         """Update status bar"""
+        self._status_message = message
         self.status_bar.config(text=message)
     
+    def _on_tree_progress(self, inserted: int, total: int):
+        """Show tree population progress, then restore the previous status"""
+        if inserted < total:
+            self.status_bar.config(text=f"Building tree: {inserted}/{total} items")
+        else:
+            self.status_bar.config(text=self._status_message)
+    
     def start_file_monitoring(self, file_path: str):
         """Start monitoring a file for changes"""
+        from file_watcher import FileWatcher
         self.current_file_path = os.path.abspath(file_path)
-        try:
-            self.last_modified_time = os.path.getmtime(self.current_file_path)
-            self.monitoring_active = True
-            self.dialog_showing = False  # Reset dialog state
-            self.last_dialog_time = 0    # Reset dialog timing
-            self._schedule_file_check()
-            self.update_status(f"Monitoring: {os.path.basename(file_path)}")
-        except OSError:
+        if not os.path.exists(self.current_file_path):
             self.update_status(f"Error: Cannot monitor {file_path}")
+            return
+        if self.file_watcher is None:
+            self.file_watcher = FileWatcher(self._post_file_changes)
+        watched = self._monitored_files()
+        self.file_watcher.watch(watched)
+        self.monitoring_active = True
+        self.dialog_showing = False  # Reset dialog state
+        self.changed_files = set()
+        includes = f" + {len(watched) - 1} included files" if len(watched) > 1 else ""
+        self.update_status(f"Monitoring: {os.path.basename(file_path)}{includes} ({self.file_watcher.method})")
+    
+    def _monitored_files(self) -> list:
+        """The monitored file and, when it is the parsed file, everything it includes"""
+        files = [self.current_file_path]
+        current = self.backend.current_file
+        if current and os.path.abspath(current) == self.current_file_path:
+            files.extend(path for path in self.backend.get_include_files() if path != self.current_file_path)
+        return files
     
     def stop_file_monitoring(self):
         """Stop monitoring the current file"""
         self.monitoring_active = False
         self.current_file_path = None
-        self.last_modified_time = None
         self.dialog_showing = False  # Reset dialog state
-        self.last_dialog_time = 0    # Reset dialog timing
+        if self.file_watcher is not None:
+            self.file_watcher.watch([])
     
-    def _schedule_file_check(self):
-        """Schedule the next file check"""
-        if self.monitoring_active:
-            self.root.after(self.file_check_interval, self._check_file_changes)
+    def _post_file_changes(self, changed: set, deleted: set):
+        """Watcher thread: hand one coalesced change event to the Tk thread"""
+        try:
+            self.root.after(0, self._on_watched_files_changed, changed, deleted)
+        except RuntimeError:
+            pass  # The window is being destroyed
     
-    def _check_file_changes(self):
-        """Check if the monitored file has changed"""
+    def _on_watched_files_changed(self, changed: set, deleted: set):
+        """React to a (debounced) batch of changes to the watched files"""
         if not self.monitoring_active or not self.current_file_path:
             return
-        
-        try:
-            current_modified_time = os.path.getmtime(self.current_file_path)
-            
-            # Use a more robust comparison - check if change is significant (> 0.1 seconds)
-            if abs(current_modified_time - self.last_modified_time) > 0.1:
-                # File has been modified significantly
-                self._handle_file_change()
-                self.last_modified_time = current_modified_time
-                
-        except OSError:
-            # File might have been deleted or moved
+        if self.current_file_path in deleted:
             self._handle_file_deleted()
             return
+        # Saves without a content change (touch, format-on-save, checkouts) don't need a reparse
+        changed = self.backend.changed_files(changed)
+        if not changed and not deleted:
+            self.update_status(f"Content unchanged, not re-parsed: {os.path.basename(self.current_file_path)}")
+            return
+        # A deleted header is a change too: the reparse will report the broken include
+        self.changed_files |= changed | deleted
+        if self.auto_reload:
+            self._auto_reload(self._change_detect_time(changed))
+        else:
+            self._handle_file_change()
+    
+    @staticmethod
+    def _change_detect_time(paths) -> float:
+        """Seconds from the newest write to the changed files until now"""
+        newest = 0.0
+        for path in paths:
+            try:
+                newest = max(newest, os.path.getmtime(path))
+            except OSError:
+                pass
+        return max(0.0, time.time() - newest) if newest else 0.0
+    
+    def set_auto_reload(self, enabled: bool):
+        """Turn automatic reloading on or off (remembered in the user config)"""
+        self.auto_reload = enabled
+        clang_config.save_user_config(auto_reload=enabled)
+    
+    def _auto_reload(self, detect_time: float):
+        """Re-parse the changed file set in the background and swap the result in"""
+        if self._reload_running:
+            self._reload_pending = max(detect_time, self._reload_pending or 0.0)
+            return
+        if not self.current_file_path or self.edit_mode:
+            return
+        self._reload_running = True
+        self.backend.invalidate_files(self.changed_files)
+        self.changed_files = set()
+        filename = self.current_file_path
+        same_file = os.path.abspath(self.backend.current_file or "") == filename
+        args = self.backend.current_args if same_file else None
+        token = self._load_token  # A load started meanwhile wins
+        result = {}
+        
+        def work():
+            try:
+                result['staged'] = staged = self.backend.prepare_parse(filename, args)
+                self._warm_display_caches(staged)
+            except Exception as e:
+                result['error'] = e
+        
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        
+        def poll():
+            if worker.is_alive():
+                self.root.after(20, poll)
+                return
+            self._reload_running = False
+            if token == self._load_token and not self.edit_mode and self.monitoring_active:
+                if 'staged' in result:
+                    self._show_reloaded_parse(result['staged'], detect_time)
+                else:
+                    self.update_status(f"Auto-reload of {os.path.basename(filename)} failed: {result['error']}")
+            pending, self._reload_pending = self._reload_pending, None
+            if pending is not None:
+                self._auto_reload(pending)
         
-        # Schedule next check
-        self._schedule_file_check()
+        self.root.after(20, poll)
+    
+    def _show_reloaded_parse(self, staged: ASTBackend, detect_time: float):
+        """Swap in an automatic reload, keeping the tree's open items, and record its latency"""
+        timings = dict(staged.parse_timings)
+        self.backend.commit_parse(staged)
+        
+        start = time.perf_counter()
+        patched = self.ast_tree.patch()
+        diff_time = time.perf_counter() - start
+        
+        # Reload the source without losing the scroll position
+        start = time.perf_counter()
+        view = self.source_viewer.text.yview()[0]
+        if self.source_viewer.load_file(self.backend.current_file):
+            self.source_viewer.text.yview_moveto(view)
+            self._apply_semantic_highlighting()
+        self.console.update_root_node(self.backend.root_node)
+        if self.filter_var.get().strip():
+            self._apply_filter()
+        
+        def rendered():
+            sample = {'detect': detect_time, 'parse': timings.get('parse', 0.0),
+                      'build': timings.get('build', 0.0), 'diff': diff_time,
+                      'render': time.perf_counter() - start}
+            self.reload_stats.add(sample)
+            changes = "tree rebuilt" if patched is None else f"{patched[1]} inserted, {patched[2]} removed"
+            self.update_status(f"Auto-reloaded {os.path.basename(self.backend.current_file)} in "
+                               f"{sum(sample.values()) * 1000:.0f} ms ({changes})")
+        
+        self.root.after_idle(rendered)  # Runs after Tk has drawn the updated widgets
+    
+    def show_reload_latency(self):
+        """Show the latency breakdown of recent automatic reloads"""
+        window = tk.Toplevel(self.root)
+        window.title("Reload Latency")
+        text = tk.Text(window, width=52, height=22, font=('Consolas', 10), wrap=tk.NONE)
+        text.pack(fill='both', expand=True, padx=5, pady=5)
+        text.insert(1.0, self.reload_stats.report())
+        text.insert(tk.END, "\n\ndetect: file write -> change seen (includes the debounce)\n"
+                            "parse: libclang   build: node tree   diff: tree patch\n"
+                            "render: source reload and redraw")
+        text.config(state='disabled')
+        ttk.Button(window, text="Close", command=window.destroy).pack(pady=(0, 5))
     
     def _handle_file_change(self):
         """Handle when the monitored file has changed"""
-        # Prevent multiple dialogs for the same change
+        # Changes arriving while the dialog is open are covered by its answer
         if self.dialog_showing:
             return
-        
-        current_time = time.time()
-        # Only show dialog if at least 2 seconds have passed since last dialog
-        if current_time - self.last_dialog_time < 2.0:
-            return
-            
         self.dialog_showing = True
-        self.last_dialog_time = current_time
         
         try:
             filename = os.path.basename(self.current_file_path)
+            headers = sorted(os.path.basename(path) for path in self.changed_files
+                             if path != self.current_file_path)
             
             # Show dialog asking user if they want to reload
-            message = (f"The file '{filename}' has been modified externally.\n\n"
-                      f"Would you like to reload and re-parse the updated file?")
+            if not headers:
+                message = (f"The file '{filename}' has been modified externally.\n\n"
+                          f"Would you like to reload and re-parse the updated file?")
+            else:
+                names = ", ".join(f"'{name}'" for name in headers[:3])
+                more = f" and {len(headers) - 3} more" if len(headers) > 3 else ""
+                message = (f"Header {names}{more} included by '{filename}' has been modified externally.\n\n"
+                          f"Would you like to re-parse '{filename}'?")
             
             if messagebox.askyesno("File Changed", message, icon='question'):
                 self._reload_current_file()
@@ -1130,20 +2842,22 @@ class ASTExplorerUI:
             return
         
         try:
-            # Re-parse the file
-            self.backend.parse_file(self.current_file_path)
+            # Forget only what the changed files invalidate, then re-parse
+            scope = self.backend.invalidate_files(self.changed_files)
+            header_count = len(self.changed_files - {self.current_file_path})
+            self.changed_files = set()
+            same_file = os.path.abspath(self.backend.current_file or "") == self.current_file_path
+            self.backend.parse_file(self.current_file_path, self.backend.current_args if same_file else None)
             
-            # Update all UI components
+            # Update all UI components (this also reloads and highlights the source)
             self.populate_ast_tree()
             
-            # Reload source code viewer
-            self.source_viewer.load_file(self.current_file_path)
-            
             # Clear info panel and console output
             self.info_panel.clear()
             
             filename = os.path.basename(self.current_file_path)
-            self.update_status(f"Reloaded: {filename}")
+            detail = f"{header_count} changed header(s) rebuilt" if scope == 'headers' else "headers reused"
+            self.update_status(f"Reloaded: {filename} ({detail})")
             
         except Exception as e:
             filename = os.path.basename(self.current_file_path) if self.current_file_path else "Unknown"
@@ -1,48 +1,98 @@
 """
 Configuration module for clang library setup
+
+libclang is located lazily: nothing happens at import time. The first
+ASTBackend calls ensure_libclang(), which reuses the library path cached in
+the user config file and only probes the system when that cache is missing
+or stale.
 """
 
 import os
 import sys
+import glob
+import json
+import re
+import ctypes
 import clang.cindex
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
+
+def _config_dir() -> str:
+    """Per-user configuration directory for the explorer"""
+    if sys.platform.startswith('win'):
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'clang-ast-explorer')
+
+CONFIG_FILE = os.path.join(_config_dir(), 'config.json')
+
+_libclang_ready = False
+
+def load_user_config() -> Dict[str, Any]:
+    """Load the user config file (empty dict if missing or unreadable)"""
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return config if isinstance(config, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_user_config(**updates) -> bool:
+    """Merge values into the user config file. Returns True if it was written."""
+    config = load_user_config()
+    config.update(updates)
+    try:
+        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
+        tmp_file = CONFIG_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2)
+        os.replace(tmp_file, CONFIG_FILE)
+        return True
+    except OSError:
+        return False
 
-def find_libclang_paths() -> List[str]:
+def _llvm_version_key(path: str):
+    """Sort key that puts the newest llvm-N / libclang-N.so first"""
+    numbers = re.findall(r'(?:llvm|libclang)-(\d+)', path)
+    return -int(numbers[0]) if numbers else 0
+
+def find_libclang_paths(include_brew: bool = True) -> List[str]:
     """Find potential libclang library paths on different systems"""
     paths = []
     
     # macOS paths
     if sys.platform == 'darwin':
         paths.extend([
-            '/usr/local/opt/llvm/lib/libclang.dylib',
             '/opt/homebrew/opt/llvm/lib/libclang.dylib',
+            '/usr/local/opt/llvm/lib/libclang.dylib',
             '/usr/local/lib/libclang.dylib',
             '/usr/lib/libclang.dylib',
+            '/Library/Developer/CommandLineTools/usr/lib/libclang.dylib',
         ])
         
-        # Try to find via brew
-        try:
-            import subprocess
-            result = subprocess.run(['brew', '--prefix', 'llvm'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                brew_path = result.stdout.strip() + '/lib/libclang.dylib'
-                paths.insert(0, brew_path)
-        except:
-            pass
+        # Asking brew costs a subprocess, so only do it when the fixed paths are exhausted
+        if include_brew:
+            try:
+                import subprocess
+                result = subprocess.run(['brew', '--prefix', 'llvm'],
+                                      capture_output=True, text=True, timeout=5)
+                if result.returncode == 0:
+                    paths.append(result.stdout.strip() + '/lib/libclang.dylib')
+            except:
+                pass
     
     # Linux paths
     elif sys.platform.startswith('linux'):
+        # Every installed llvm-N in one glob each, newest version first
+        versioned = glob.glob('/usr/lib/llvm-*/lib/libclang.so*')
+        versioned += glob.glob('/usr/lib/x86_64-linux-gnu/libclang-*.so*')
+        versioned += glob.glob('/usr/lib64/llvm*/lib/libclang.so*')
+        versioned = [path for path in versioned if 'libclang-cpp' not in path]  # C++ API, not libclang
+        paths.extend(sorted(versioned, key=_llvm_version_key))
         paths.extend([
             '/usr/lib/x86_64-linux-gnu/libclang-1.0.so',
             '/usr/lib/libclang.so',
             '/usr/local/lib/libclang.so',
-            '/usr/lib/llvm-15/lib/libclang.so.1',
-            '/usr/lib/llvm-14/lib/libclang.so.1',
-            '/usr/lib/llvm-13/lib/libclang.so.1',
-            '/usr/lib/llvm-12/lib/libclang.so.1',
-            '/usr/lib/llvm-11/lib/libclang.so.1',
-            '/usr/lib/llvm-10/lib/libclang.so.1',
         ])
     
     # Windows paths
@@ -55,29 +105,66 @@ def find_libclang_paths() -> List[str]:
     
     return paths
 
-def setup_libclang() -> bool:
-    """Setup libclang library path. Returns True if successful."""
+def _load_library(path: Optional[str]) -> bool:
+    """Point the bindings at a library (None = their default lookup) and load it
     
-    # Check if already configured
+    On failure the bindings are left as they were, so a bad path doesn't
+    stick and the next attempt (e.g. the default lookup) really uses its own.
+    """
+    if path and not os.path.isfile(path):
+        return False
+    previous = clang.cindex.Config.library_file
     try:
-        clang.cindex.Index.create()
+        if path:
+            clang.cindex.Config.set_library_file(path)
+        clang.cindex.conf.lib  # Loads the shared library
+        return True
+    except Exception:
+        clang.cindex.Config.library_file = previous
+        return False
+
+def libclang_version() -> Optional[str]:
+    """Version string of the loaded libclang, e.g. 'clang version 18.1.1'"""
+    try:
+        # A private prototype, so the library's shared function object keeps its restype
+        prototype = ctypes.CFUNCTYPE(clang.cindex._CXString)
+        get_version = prototype(('clang_getClangVersion', clang.cindex.conf.lib))
+        return clang.cindex._CXString.from_result(get_version())
+    except Exception:
+        return None
+
+def _library_stamp(path: Optional[str]) -> Optional[list]:
+    """[real path, mtime_ns, size] of the library file a path (None = default lookup) resolves to"""
+    try:
+        filename = path or clang.cindex.conf.get_filename()
+        stat = os.stat(filename)
+        return [os.path.realpath(filename), stat.st_mtime_ns, stat.st_size]
+    except (OSError, TypeError):
+        return None  # Found through the loader path: nothing on disk to compare
+
+def _remember(path: Optional[str]):
+    """Cache the working library so the next start skips probing"""
+    save_user_config(libclang={'path': path, 'stamp': _library_stamp(path),
+                               'version': libclang_version()})
+
+def setup_libclang() -> bool:
+    """Probe the system for libclang. Returns True if successful."""
+    
+    # Default lookup first (bundled wheels, library already on the loader path)
+    if _load_library(None):
+        _remember(None)
         return True
-    except clang.cindex.LibclangError:
-        pass
     
     # Try to find and set library path
-    paths = find_libclang_paths()
+    paths = find_libclang_paths(include_brew=False)
+    if sys.platform == 'darwin' and not any(os.path.exists(path) for path in paths):
+        paths = find_libclang_paths(include_brew=True)
     
     for path in paths:
-        if os.path.exists(path):
-            try:
-                clang.cindex.Config.set_library_file(path)
-                # Test if it works
-                clang.cindex.Index.create()
-                print(f"Using libclang from: {path}")
-                return True
-            except Exception as e:
-                continue
+        if os.path.exists(path) and _load_library(path):
+            print(f"Using libclang from: {path}")
+            _remember(path)
+            return True
     
     # If nothing worked, show error message
     print("Error: Could not find libclang library!")
@@ -97,7 +184,25 @@ def setup_libclang() -> bool:
     
     return False
 
-# Auto-configure when module is imported
-if not setup_libclang():
-    print("Warning: libclang setup failed. The application may not work correctly.")
-    print("Note: If using the 'clang' package (20.1.5), this warning can be ignored.")
\ No newline at end of file
+def ensure_libclang() -> bool:
+    """Configure libclang on first use, preferring the cached location. Returns True if ready."""
+    global _libclang_ready
+    if _libclang_ready or clang.cindex.Config.loaded:
+        _libclang_ready = True
+        return True
+    
+    # The cache is trusted only while the library file is the one it describes
+    # (an LLVM upgrade replaces it in place or removes it)
+    cached = load_user_config().get('libclang')
+    if isinstance(cached, dict) and 'path' in cached and 'stamp' in cached:
+        cached_path = cached.get('path')
+        # Validated before the bindings are pointed at it
+        if cached.get('stamp') == _library_stamp(cached_path) and _load_library(cached_path):
+            _libclang_ready = True
+            return True
+    
+    _libclang_ready = setup_libclang()
+    if not _libclang_ready:
+        print("Warning: libclang setup failed. The application may not work correctly.")
+        print("Note: If using the 'clang' package (20.1.5), this warning can be ignored.")
+    return _libclang_ready
@@ -0,0 +1,311 @@
+"""
+File Watcher - Background change notification for the files the explorer shows
+
+On Linux the watcher blocks on inotify (through ctypes, no extra package),
+so it costs nothing while files are idle and sees a save within
+milliseconds. Elsewhere, or when inotify is unavailable, it falls back to
+polling file stats. Either way a burst of writes (an editor's save, a
+formatter, a script rewriting the file several times) is reported as one
+change once the files have been quiet for the debounce period.
+"""
+
+import os
+import sys
+import errno
+import select
+import struct
+import threading
+import time
+import ctypes
+import ctypes.util
+from typing import Callable, Dict, Iterable, Optional, Set
+
+# inotify event masks (<sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Directories are watched rather than files: editors that save by writing a
+# new file and renaming it over the old one would otherwise drop the watch
+DIRECTORY_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len (name follows)
+
+def _load_inotify():
+    """libc with the inotify functions, or None when they are not available"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+def _file_state(path: str):
+    """What a change to a file alters: (mtime_ns, size, inode), or None if it is missing"""
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    except OSError:
+        return None
+
+class FileWatcher:
+    """Watches a set of files on a daemon thread and reports changes in coalesced batches
+
+    on_change(changed, deleted) is called on the watcher thread with two sets
+    of absolute paths; the receiver is responsible for handing them to its
+    own thread. watch() replaces the watched set at any time.
+    """
+
+    DEBOUNCE = 0.15      # Seconds of quiet before a burst of writes is reported
+    MAX_DELAY = 1.0      # A file that keeps changing is still reported this often
+    POLL_INTERVAL = 1.0  # Seconds between stat checks when polling
+
+    def __init__(self, on_change: Callable[[Set[str], Set[str]], None],
+                 debounce: float = DEBOUNCE, poll_interval: float = POLL_INTERVAL,
+                 use_inotify: bool = True):
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._paths: Set[str] = set()
+        self._states: Dict[str, Optional[tuple]] = {}  # Last reported state per path
+        self._stopped = False
+        self._dirty = False  # The watched set changed; the thread re-syncs its watches
+
+        self._libc = _load_inotify() if use_inotify else None
+        self._fd = -1
+        if self._libc is not None:
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self._fd < 0:
+                self._libc = None
+        self._wake_read, self._wake_write = os.pipe()
+
+        self._thread = threading.Thread(target=self._run, name="FileWatcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def method(self) -> str:
+        """'inotify' or 'polling'"""
+        return 'inotify' if self._libc is not None else 'polling'
+
+    def watch(self, paths: Iterable[str]):
+        """Watch exactly these files from now on (an empty set pauses the watcher)"""
+        paths = {os.path.abspath(path) for path in paths}
+        with self._lock:
+            for path in paths - self._paths:
+                self._states[path] = _file_state(path)
+            for path in self._paths - paths:
+                self._states.pop(path, None)
+            self._paths = paths
+            self._dirty = True
+        self._wake()
+
+    @property
+    def paths(self) -> Set[str]:
+        with self._lock:
+            return set(self._paths)
+
+    def stop(self):
+        """Stop the thread and release its descriptors (calling it again does nothing)"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wake()
+        self._thread.join(timeout=2.0)
+        if not self._thread.is_alive():
+            # Closed only now: a descriptor number closed earlier could already belong to
+            # another file by the time a late watch() or stop() writes to it
+            with self._lock:
+                os.close(self._wake_read)
+                os.close(self._wake_write)
+                self._wake_read = self._wake_write = -1
+
+    def _wake(self):
+        with self._lock:
+            if self._wake_write < 0:
+                return  # Stopped
+            try:
+                os.write(self._wake_write, b'x')
+            except OSError:
+                pass
+
+    def _run(self):
+        try:
+            if self._libc is not None:
+                self._run_inotify()
+            else:
+                self._run_polling()
+        finally:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    # inotify
+    def _run_inotify(self):
+        watches: Dict[int, str] = {}      # wd -> directory
+        directories: Dict[str, int] = {}  # directory -> wd
+        unwatched: Set[str] = set()       # Files whose directory could not be watched (polled)
+        pending: Set[str] = set()         # Paths touched since the last report
+        first_event = last_event = 0.0
+
+        while not self._stopped:
+            if self._dirty:
+                unwatched = self._sync_watches(watches, directories)
+
+            # Block until something happens; wake up only to end a debounce or poll a stray file
+            timeout = None
+            if pending:
+                now = time.monotonic()
+                timeout = max(0.0, min(last_event + self.debounce, first_event + self.MAX_DELAY) - now)
+            elif unwatched:
+                timeout = self.poll_interval
+            readable, _, _ = select.select([self._fd, self._wake_read], [], [], timeout)
+
+            if self._wake_read in readable:
+                os.read(self._wake_read, 4096)
+            touched = set()
+            if self._fd in readable:
+                touched = self._read_events(watches, directories)
+            if not readable and unwatched and not pending:
+                touched = {path for path in unwatched if self._states.get(path) != _file_state(path)}
+                self._dirty = bool(touched)  # Its directory may be back: try watching it again
+
+            if touched:
+                now = time.monotonic()
+                if not pending:
+                    first_event = now
+                last_event = now
+                pending |= touched
+            if pending and (not readable or last_event - first_event >= self.MAX_DELAY):
+                self._report(pending)
+                pending = set()
+
+    def _sync_watches(self, watches: Dict[int, str], directories: Dict[str, int]) -> Set[str]:
+        """Watch the directories of the current paths; returns the files that must be polled"""
+        with self._lock:
+            self._dirty = False
+            paths = set(self._paths)
+        wanted = {os.path.dirname(path) for path in paths}
+
+        for directory in list(directories):
+            if directory not in wanted:
+                wd = directories.pop(directory)
+                watches.pop(wd, None)
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+        failed = set()
+        for directory in wanted - set(directories):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), DIRECTORY_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    print(f"Warning: inotify watch limit reached, polling files in {directory}")
+                failed.add(directory)
+                continue
+            watches[wd] = directory
+            directories[directory] = wd
+        return {path for path in paths if os.path.dirname(path) in failed}
+
+    def _read_events(self, watches: Dict[int, str], directories: Dict[str, int]) -> Set[str]:
+        """Drain the inotify descriptor; returns the watched paths the events name"""
+        touched = set()
+        with self._lock:
+            paths = self._paths
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    touched |= paths  # Events were lost: check everything
+                    continue
+                directory = watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    # The directory itself went away: its files are gone, re-watch when possible
+                    if mask & IN_IGNORED:
+                        del watches[wd]
+                        directories.pop(directory, None)
+                    touched |= {path for path in paths if os.path.dirname(path) == directory}
+                    self._dirty = True
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if path in paths:
+                    touched.add(path)
+        return touched
+
+    # Polling
+    def _run_polling(self):
+        pending: Set[str] = set()
+        settling: Dict[str, Optional[tuple]] = {}  # State of the pending files at the last check
+        first_event = 0.0
+        while not self._stopped:
+            # Poll slowly while idle, quickly while a burst is settling
+            timeout = self.debounce if pending else self.poll_interval
+            readable, _, _ = select.select([self._wake_read], [], [], timeout)
+            if readable:
+                os.read(self._wake_read, 4096)
+                continue
+
+            with self._lock:
+                paths = set(self._paths)
+            if pending:
+                # Report once the files stopped changing (or have kept changing too long)
+                settled = all(settling.get(path) == _file_state(path) for path in pending)
+                if settled or time.monotonic() - first_event > self.MAX_DELAY:
+                    self._report(pending)
+                    pending = set()
+                else:
+                    settling = {path: _file_state(path) for path in pending}
+                continue
+
+            changed = {path for path in paths if self._states.get(path) != _file_state(path)}
+            if changed:
+                pending = changed
+                first_event = time.monotonic()
+                settling = {path: _file_state(path) for path in pending}
+
+    def _report(self, touched: Set[str]):
+        """Tell the receiver which touched files changed or disappeared since the last report"""
+        changed, deleted = set(), set()
+        with self._lock:
+            for path in touched:
+                if path not in self._paths:
+                    continue  # Unwatched while the burst settled
+                state = _file_state(path)
+                if state == self._states.get(path):
+                    continue  # Nothing a stat can see changed (e.g. a read-only open)
+                self._states[path] = state
+                (deleted if state is None else changed).add(path)
+        if changed or deleted:
+            try:
+                self.on_change(changed, deleted)
+            except Exception as e:
+                print(f"Warning: file change handler failed: {e}")
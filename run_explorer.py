@@ -10,11 +10,10 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from ast_explorer import ASTExplorer
+    from ast_explorer import main
     
     if __name__ == "__main__":
-        app = ASTExplorer()
-        app.run()
+        main()
         
 except ImportError as e:
     print(f"Error importing modules: {e}")
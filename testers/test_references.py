@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test Reference Edges - Go-to-definition and find-all-references
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import AST explorer modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import clang_config
+from ast_backend import ASTBackend
+
+def test_references():
+    """Test the precomputed reference edges"""
+    print("Reference Edges Test")
+    print("====================")
+    
+    backend = ASTBackend()
+    test_file = '../test/long_short.cpp'
+    
+    print(f"Parsing {test_file}...")
+    try:
+        backend.parse_file(test_file)
+        print(f"✅ File parsed successfully ({len(backend.nodes)} nodes)")
+    except Exception as e:
+        print(f"❌ Error parsing file: {e}")
+        return
+    
+    print(f"\nDeclarations used in the main file:")
+    print("-" * 50)
+    
+    for decl, user_ids in backend.referenced_by.items():
+        print(f"{decl.display_name} ({decl.location_str}) - {len(user_ids)} uses")
+        for user in backend.get_references(decl):
+            definition = backend.get_definition(user)
+            status = "✅" if definition is decl else "❌"
+            print(f"   {status} {user.cursor.kind.name} at {user.location_str}")
+    
+    print(f"\n🎉 Reference edges test completed!")
+
+if __name__ == "__main__":
+    test_references()
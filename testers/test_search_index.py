@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test Search Index - Trigram filter index used by the tree filter box
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path to import AST explorer modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import clang_config
+from ast_backend import ASTBackend
+from ast_index import get_search_index
+
+def test_search_index(test_file='../test/comprehensive_test.cpp', *queries):
+    """Build the index for a file and time a few queries against a linear scan"""
+    print("Search Index Test")
+    print("=================")
+    
+    backend = ASTBackend()
+    print(f"Parsing {test_file}...")
+    try:
+        backend.parse_file(test_file)
+        print("✅ File parsed successfully")
+    except Exception as e:
+        print(f"❌ Error parsing file: {e}")
+        return
+    
+    start = time.perf_counter()
+    index = get_search_index(backend)
+    print(f"Index: {index.node_count} nodes, {len(index.texts)} distinct texts, "
+          f"{len(index.trigrams)} trigrams in {time.perf_counter() - start:.2f} s")
+    
+    for query in queries or ('a', 'ma', 'main', 'Rectangle', 'size_t'):
+        start = time.perf_counter()
+        matches, total = index.search_with_total(query, limit=10**9)
+        search_ms = (time.perf_counter() - start) * 1000
+        
+        # Cross-check against a scan of the distinct texts (substring match at every length)
+        q = query.lower()
+        expected = sum(len(nodes) for text, nodes in zip(index.texts, index.text_nodes) if q in text)
+        status = "✅" if total == expected == len(matches) else "❌"
+        print(f"{status} {query!r}: {total} matches in {search_ms:.2f} ms")
+    
+    print(f"\n🎉 Search index test completed!")
+
+if __name__ == "__main__":
+    test_search_index(*sys.argv[1:])